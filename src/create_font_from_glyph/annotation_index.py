@@ -0,0 +1,103 @@
+from collections import namedtuple
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from image_storage import image_key_from_url
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# bump when the entries change, so indexes written before are rebuilt
+INDEX_VERSION = 1
+ACCEPT = b'"accept"'
+
+# offset and length are the bytes of the line in the batch file; stack is the Tibetan label of its image
+IndexEntry = namedtuple("IndexEntry", ["offset", "length", "id", "image_key", "stack"])
+
+
+def loads(data):
+    """Decodes JSON bytes with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def stack_from_image_key(image_key):
+    """Returns the Tibetan characters of an image file name, e.g. ཀ for pages/ཀ_12.png."""
+    file_name = os.path.splitext(image_key.split("/")[-1])[0]
+    return re.sub(r'[^\u0F00-\u0FFF]', '', re.sub(r'(_\d+)$', '', file_name))
+
+
+def index_path(jsonl_path, index_dir):
+    # batch files of the same name can live in different folders
+    digest = hashlib.sha1(os.path.abspath(jsonl_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(index_dir, f"{os.path.basename(jsonl_path)}.{digest}.index.json")
+
+
+def build_entries(jsonl_path):
+    """Reads a batch file once and returns the IndexEntry of each accepted line."""
+    entries = []
+    offset = 0
+    with open(jsonl_path, 'rb') as f:
+        for line_number, raw_line in enumerate(f, 1):
+            # a line whose answer is accept has that word in it; the others are not worth decoding
+            if ACCEPT in raw_line and raw_line.strip():
+                try:
+                    line = loads(raw_line)
+                except ValueError:
+                    logging.error(f"Skipping invalid JSON on line {line_number} of {jsonl_path}")
+                    line = {}
+                if line.get("answer") == "accept":
+                    image_key = image_key_from_url(line["image"])
+                    stack = stack_from_image_key(image_key)
+                    entries.append(IndexEntry(offset, len(raw_line), line["id"], image_key, stack))
+            offset += len(raw_line)
+    return entries
+
+
+class AnnotationIndex:
+    """The accepted lines of one annotation batch file: where they are, their IDs, image keys and stacks.
+
+    load() reuses the index saved in index_dir while the batch file keeps its size and
+    modification time, and rebuilds it otherwise. Lines are then read by seeking straight to
+    them, so rejected lines are never decoded, and accepted ones only when they are needed.
+    """
+
+    def __init__(self, jsonl_path, entries):
+        self.jsonl_path = jsonl_path
+        self.entries = entries
+
+    @classmethod
+    def load(cls, jsonl_path, index_dir=None):
+        stat = os.stat(jsonl_path)
+        file_state = {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        path = index_path(jsonl_path, index_dir) if index_dir is not None else None
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                try:
+                    saved = loads(f.read())
+                except ValueError:
+                    saved = {}
+            if all(saved.get(key) == value for key, value in file_state.items()):
+                return cls(jsonl_path, [IndexEntry(*entry) for entry in saved["entries"]])
+
+        entries = build_entries(jsonl_path)
+        if path is not None:
+            os.makedirs(index_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".json", dir=index_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({**file_state, "entries": entries}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        return cls(jsonl_path, entries)
+
+    def read_lines(self, entries=None):
+        """Yields the decoded lines of entries, by default of every accepted line, in file order."""
+        with open(self.jsonl_path, 'rb') as f:
+            for entry in self.entries if entries is None else entries:
+                f.seek(entry.offset)
+                yield loads(f.read(entry.length))
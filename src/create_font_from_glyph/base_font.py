@@ -1,120 +1,167 @@
-from fontTools.ttLib import TTFont, newTable
+from functools import lru_cache
+import io
+import struct
+from fontTools.fontBuilder import FontBuilder
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.standardGlyphOrder import standardGlyphOrder
+from fontTools.ttLib.tables.DefaultTable import DefaultTable
 from fontTools.ttLib.tables._g_l_y_f import Glyph
-from fontTools.ttLib.tables._c_m_a_p import cmap_format_4, cmap_format_12
+from build_cache import glyph_metrics
+from glyf_assembly import expanded_glyph_metrics
+
+UNITS_PER_EM = 1000
+NOTDEF_WIDTH = 500
+# the post header before numGlyphs, and the indices of the names every post table knows without storing them
+POST_HEADER_SIZE = 32
+STANDARD_NAME_INDEX = {glyph_name: index for index, glyph_name in enumerate(standardGlyphOrder)}
+
+
+def build_minimal_font():
+    """Returns a skeleton TTF with only an empty .notdef glyph, which the space character maps to."""
+    font_builder = FontBuilder(UNITS_PER_EM, isTTF=True)
+    font_builder.setupGlyphOrder([".notdef"])
+    font_builder.setupCharacterMap({32: ".notdef"})
+    font_builder.setupGlyf({".notdef": Glyph()})
+    font_builder.setupHorizontalMetrics({".notdef": (NOTDEF_WIDTH, 0)})
+    font_builder.setupHorizontalHeader(ascent=800, descent=-200)
+    font_builder.setupNameTable({"familyName": "Example Font", "styleName": "Regular",
+                                 "uniqueFontIdentifier": "Example Font;1.0;2023"})
+    font_builder.setupOS2(
+        version=4, xAvgCharWidth=NOTDEF_WIDTH, usWeightClass=400, usWidthClass=5, fsType=0x0004,
+        ySubscriptXSize=650, ySubscriptYSize=700, ySubscriptXOffset=0, ySubscriptYOffset=140,
+        ySuperscriptXSize=650, ySuperscriptYSize=700, ySuperscriptXOffset=0, ySuperscriptYOffset=490,
+        yStrikeoutSize=50, yStrikeoutPosition=350, sFamilyClass=0,
+        ulUnicodeRange1=0xFFFFFFFF, ulUnicodeRange2=0xFFFFFFFF, ulUnicodeRange3=0xFFFFFFFF, ulUnicodeRange4=0xFFFFFFFF,
+        achVendID="NONE", fsSelection=0x0040, usFirstCharIndex=32, usLastCharIndex=32,
+        sTypoAscender=800, sTypoDescender=-200, sTypoLineGap=200, usWinAscent=800, usWinDescent=200,
+        ulCodePageRange1=0xFFFFFFFF, ulCodePageRange2=0xFFFFFFFF)
+    font_builder.setupPost(underlinePosition=-100, underlineThickness=50)
+    return font_builder.font
+
 
 def create_minimal_font(font_path):
-    font = TTFont()
-
-    # Initialize necessary tables
-    font['head'] = newTable('head')
-    font['hhea'] = newTable('hhea')
-    font['maxp'] = newTable('maxp')
-    font['post'] = newTable('post')
-    font['name'] = newTable('name')
-    font['OS/2'] = newTable('OS/2')
-    font['glyf'] = newTable('glyf')
-    font['hmtx'] = newTable('hmtx')
-    font['loca'] = newTable('loca')
-    font['cmap'] = newTable('cmap')
-
-    # Setup 'glyf' table
-    glyph = Glyph()
-    glyph.coordinates = []
-    glyph.endPtsOfContours = []
-    glyph.flags = []
-    font['glyf']['.notdef'] = glyph  # Correct assignment
-    font['hmtx']['.notdef'] = (500, 0)  # Correct hmtx setup
-
-    # Setup 'cmap' table
-    cmap_table = font['cmap']
-    cmap_table.tableVersion = 0
-    cmap_table.tables = []
-
-    # cmap format 4
-    cmap4 = cmap_format_4(4)
-    cmap4.platformID = 3
-    cmap4.platEncID = 1
-    cmap4.language = 0
-    cmap4.cmap = {32: 0}  # Mapping space character
-
-    # cmap format 12
-    cmap12 = cmap_format_12(12)
-    cmap12.platformID = 3
-    cmap12.platEncID = 10
-    cmap12.language = 0
-    cmap12.cmap = {32: 0}  # Mapping space character again for full range
-
-    # Append subtables to the cmap table
-    cmap_table.tables.append(cmap4)
-    cmap_table.tables.append(cmap12)
-
-    # Setup 'glyf', 'loca', and 'hmtx' for at least one glyph (space character)
-    glyph = Glyph()  # Create a glyph instance
-    glyph.coordinates = []
-    glyph.endPtsOfContours = []
-    glyph.flags = []
-    font['glyf']['.notdef'] = glyph
-    font['hmtx'][0] = (500, 0)
-    # Setup 'glyf', 'loca', and 'hmtx' for at least one glyph (space character)
-    glyph = font['glyf'].glyphs['.notdef'] = font['glyf'].Glyph()
-    glyph.coordinates = []
-    glyph.endPtsOfContours = []
-    glyph.flags = []
-    font['hmtx'][0] = (500, 0)  # Advance width and left side bearing for '.notdef'
-
-    # Setup 'post' table
-    font['post'].formatType = 2.0
-    font['post'].italicAngle = 0
-    font['post'].underlinePosition = -100
-    font['post'].underlineThickness = 50
-    font['post'].isFixedPitch = 0
-    font['post'].minMemType42 = 0
-    font['post'].maxMemType42 = 0
-    font['post'].minMemType1 = 0
-    font['post'].maxMemType1 = 0
-
-    # Setup 'name' table
-    name_record = font['name']
-    name_record.setName("Example Font", 1, 3, 1, 1033)  # Family Name
-    name_record.setName("Regular", 2, 3, 1, 1033)  # Subfamily Name
-    name_record.setName("Example Font;1.0;2023", 5, 3, 1, 1033)  # Version string
-
-    # Setup 'OS/2' table
-    font['OS/2'].version = 4
-    font['OS/2'].xAvgCharWidth = 500
-    font['OS/2'].usWeightClass = 400
-    font['OS/2'].usWidthClass = 5
-    font['OS/2'].fsType = 0x0004  # Installable embedding
-    font['OS/2'].ySubscriptXSize = 650
-    font['OS/2'].ySubscriptYSize = 700
-    font['OS/2'].ySubscriptXOffset = 0
-    font['OS/2'].ySubscriptYOffset = 140
-    font['OS/2'].ySuperscriptXSize = 650
-    font['OS/2'].ySuperscriptYSize = 700
-    font['OS/2'].ySuperscriptXOffset = 0
-    font['OS/2'].ySuperscriptYOffset = 490
-    font['OS/2'].yStrikeoutSize = 50
-    font['OS/2'].yStrikeoutPosition = 350
-    font['OS/2'].sFamilyClass = 0
-    font['OS/2'].panose = (2, 11, 6, 9, 4, 2, 2, 2, 2, 4)
-    font['OS/2'].ulUnicodeRange1 = 0xFFFFFFFF
-    font['OS/2'].ulUnicodeRange2 = 0xFFFFFFFF
-    font['OS/2'].ulUnicodeRange3 = 0xFFFFFFFF
-    font['OS/2'].ulUnicodeRange4 = 0xFFFFFFFF
-    font['OS/2'].achVendID = "NONE"
-    font['OS/2'].fsSelection = 0x0040
-    font['OS/2'].usFirstCharIndex = 32
-    font['OS/2'].usLastCharIndex = 32
-    font['OS/2'].sTypoAscender = 800
-    font['OS/2'].sTypoDescender = -200
-    font['OS/2'].sTypoLineGap = 200
-    font['OS/2'].usWinAscent = 800
-    font['OS/2'].usWinDescent = 200
-    font['OS/2'].ulCodePageRange1 = 0xFFFFFFFF
-    font['OS/2'].ulCodePageRange2 = 0xFFFFFFFF
-
-    # Save the font
-    font.save(font_path)
+    build_minimal_font().save(font_path)
     print(f"Font saved at {font_path}")
 
-create_minimal_font("minimal_font.ttf")
+
+class BaseFontTemplate:
+    """A base font held in memory as bytes, from which any number of new fonts are started.
+
+    The base font file is read, or the minimal skeleton built, once. Every new font opens those
+    bytes, and the tables nothing changes (name, OS/2) are never decompiled and are written out
+    as they are; save_font() writes post from the base font's compiled glyph names. head and the
+    tables glyphs are added to are decompiled per font from their bytes, which clones them.
+    """
+
+    def __init__(self, font_path=None):
+        self.font_path = font_path
+        self._data = None
+        self._font = None
+        self._glyph_metrics = None
+        self._post_parts = None
+
+    @property
+    def data(self):
+        """The compiled bytes of the base font."""
+        if self._data is None:
+            if self.font_path is None:
+                buffer = io.BytesIO()
+                build_minimal_font().save(buffer)
+                self._data = buffer.getvalue()
+            else:
+                with open(self.font_path, 'rb') as f:
+                    self._data = f.read()
+        return self._data
+
+    @property
+    def font(self):
+        """The base font, opened lazily; only to be read, new fonts come from new_font()."""
+        if self._font is None:
+            self._font = TTFont(io.BytesIO(self.data), lazy=True)
+        return self._font
+
+    def glyph_order(self):
+        return list(self.font.getGlyphOrder())
+
+    def glyph_metrics(self):
+        """Returns the metrics of the base glyphs by name, for recalc_font_metrics, so new fonts never expand them."""
+        if self._glyph_metrics is None:
+            self._glyph_metrics = {}
+            if 'glyf' in self.font:
+                glyf_table = self.font['glyf']
+                for glyph_name in self.glyph_order():
+                    glyph = glyf_table[glyph_name]
+                    if hasattr(glyph, "data") and glyph.numberOfContours >= 0:
+                        self._glyph_metrics[glyph_name] = glyph_metrics(glyph.data)
+                    else:
+                        self._glyph_metrics[glyph_name] = expanded_glyph_metrics(glyf_table, glyph_name)
+        return self._glyph_metrics
+
+    def new_font(self, recalc_bboxes=True):
+        """Returns a new font made of the base font's tables, ready for glyphs to be added."""
+        # tables are only decompiled when accessed; lazy=True would also break saving a font read from memory
+        font = TTFont(io.BytesIO(self.data), recalcBBoxes=recalc_bboxes)
+        # setting the glyph order keeps TTFont from decompiling post to get it
+        font.setGlyphOrder(self.glyph_order())
+        return font
+
+    def save_font(self, font, new_font_path):
+        """Saves a font started with new_font(), with the glyph names of the glyphs added to it in post."""
+        if 'post' in font and not font.isLoaded('post'):
+            post_data = self.post_data(font.getGlyphOrder())
+            if post_data is None:
+                # decompiled, so fontTools compiles it again with the new glyph names
+                font['post']
+            else:
+                post_table = DefaultTable('post')
+                post_table.data = post_data
+                font['post'] = post_table
+        font.save(new_font_path)
+
+    def post_data(self, glyph_order):
+        """Returns the compiled post table for glyph_order, or None when fontTools has to compile it.
+
+        A format 3 table holds no glyph names and is kept as it is. For format 2 the base glyphs'
+        name indices and names are kept as compiled and the added glyphs' are appended, as long as
+        glyph_order starts with the base glyph order.
+        """
+        base_data = self.font.reader['post']
+        format_type = struct.unpack_from(">l", base_data)[0]
+        if format_type == 0x00030000:
+            return base_data
+        base_glyph_order = self.glyph_order()
+        if format_type != 0x00020000 or glyph_order[:len(base_glyph_order)] != base_glyph_order:
+            return None
+        if self._post_parts is None:
+            base_count = struct.unpack_from(">H", base_data, POST_HEADER_SIZE)[0]
+            names_start = POST_HEADER_SIZE + 2 + 2 * base_count
+            name_count = position = 0
+            names = base_data[names_start:]
+            while position < len(names):
+                position += names[position] + 1
+                name_count += 1
+            base_indices = base_data[POST_HEADER_SIZE + 2:names_start]
+            self._post_parts = (base_data[:POST_HEADER_SIZE], base_indices, names, name_count)
+        header, base_indices, base_names, name_count = self._post_parts
+
+        indices = []
+        names = []
+        for glyph_name in glyph_order[len(base_glyph_order):]:
+            if glyph_name in STANDARD_NAME_INDEX:
+                indices.append(STANDARD_NAME_INDEX[glyph_name])
+            else:
+                indices.append(len(standardGlyphOrder) + name_count + len(names))
+                name = glyph_name.encode('latin-1')
+                names.append(bytes([len(name)]) + name)
+        return b"".join([header, struct.pack(">H", len(glyph_order)), base_indices,
+                         struct.pack(f">{len(indices)}H", *indices), base_names, *names])
+
+
+@lru_cache(maxsize=None)
+def base_font_template(font_path=None):
+    """Returns the template of the font at font_path, or of the minimal skeleton; each is loaded once per process."""
+    return BaseFontTemplate(font_path)
+
+
+if __name__ == "__main__":
+    create_minimal_font("minimal_font.ttf")
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+import numpy as np
+from glyph_outline import GlyphOutline
+from pipeline_for_ttf_from_scratch import create_font
+
+GLYPH_COUNTS = [1000, 10000, 50000]
+# supplementary private use area, so 50k codepoints don't run out
+FIRST_CODEPOINT = 0xF0000
+
+
+def synthetic_glyph(index):
+    """Returns a glyph with a square contour and a cubic contour, shifted along x by index."""
+    x = index % 500
+    points = np.array([
+        (x, 0), (x, 600), (x + 400, 600), (x + 400, 0),
+        (x + 100, 100), (x + 100, 300), (x + 300, 300), (x + 300, 100),
+    ], dtype=float)
+    types = np.array([0, 1, 1, 1, 0, 2, 2, 3])
+    contour_ends = np.array([3, 7])
+    return GlyphOutline(points, types, contour_ends).to_glyph()
+
+
+def synthetic_glyphs_data(glyph_count):
+    return [(synthetic_glyph(index), [FIRST_CODEPOINT + index], f"u{FIRST_CODEPOINT + index:X}")
+            for index in range(glyph_count)]
+
+
+def time_create_font(glyphs_data, repeat=3):
+    """Returns the best time out of repeat builds of a font from glyphs_data."""
+    best = float('inf')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font_path = os.path.join(temp_dir, "benchmark.ttf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            create_font(glyphs_data, font_path)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for glyph_count in GLYPH_COUNTS:
+        glyphs_data = synthetic_glyphs_data(glyph_count)
+        seconds = time_create_font(glyphs_data, repeat=3 if glyph_count < 50000 else 1)
+        print(f"{glyph_count} glyphs: {seconds:.2f}s, {seconds / glyph_count * 1e6:.0f}us per glyph")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import time
+import uharfbuzz as hb
+from glyph_manifest import load_glyph_records
+
+FONT_PATH = "../../data/derge_font/ttf/derge.ttf"
+SVG_DIRECTORY = "../../data/derge_font/svg"
+SAMPLE_TEXT = [
+    "བཀྲ་ཤིས་བདེ་ལེགས།",
+    "སེམས་ཅན་ཐམས་ཅད་བདེ་བ་དང་"
+    "བདེ་བའི་རྒྱུ་དང་ལྡན་པར་གྱུར་ཅིག",
+    "ཨོཾ་མ་ཎི་པདྨེ་ཧཱུྃ།",
+]
+TSHEG = "་"
+
+
+def sample_lines(text_path=None, svg_directory=SVG_DIRECTORY):
+    """Returns the lines of text_path, or the sample text plus a line of every character and stack in svg_directory."""
+    if text_path is not None:
+        with open(text_path, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    stacks = [record["svg"].split('_')[0] for record in load_glyph_records(svg_directory)]
+    return SAMPLE_TEXT + [TSHEG.join(stacks)]
+
+
+def shape_lines(font, lines, features=None):
+    """Shapes every line and returns (number of glyphs, number of them that are .notdef)."""
+    glyph_count = notdef_count = 0
+    for line in lines:
+        buffer = hb.Buffer()
+        buffer.add_str(line)
+        buffer.guess_segment_properties()
+        hb.shape(font, buffer, features)
+        glyph_count += len(buffer.glyph_infos)
+        notdef_count += sum(1 for info in buffer.glyph_infos if info.codepoint == 0)
+    return glyph_count, notdef_count
+
+
+def time_shaping(font, lines, features=None, repeat=200):
+    """Returns the best time out of repeat passes over the lines."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        shape_lines(font, lines, features)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(font_path=FONT_PATH, text_path=None, repeat=200):
+    lines = sample_lines(text_path)
+    character_count = sum(len(line) for line in lines)
+    font = hb.Font(hb.Face(hb.Blob.from_file_path(font_path)))
+    # the stack ligatures are in ccmp; turning it off shows what they cost
+    for label, features in (("with stack ligatures", None), ("without stack ligatures", {"ccmp": False})):
+        glyph_count, notdef_count = shape_lines(font, lines, features)
+        seconds = time_shaping(font, lines, features, repeat)
+        print(f"{label}: {character_count} characters -> {glyph_count} glyphs ({notdef_count} .notdef), "
+              f"{character_count / seconds:,.0f} characters/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure HarfBuzz shaping throughput of a built font on Tibetan text.")
+    parser.add_argument("--font", default=FONT_PATH, help="font to shape with")
+    parser.add_argument("--text", help="UTF-8 text file to shape, one line at a time, instead of the built-in sample")
+    parser.add_argument("--repeat", type=int, default=200,
+                        help="number of passes over the text; the best one is reported")
+    args = parser.parse_args()
+    main(args.font, args.text, args.repeat)
@@ -0,0 +1,54 @@
+import os
+import time
+from xml.etree import ElementTree as ET
+import numpy as np
+from glyph_outline import GlyphOutline
+
+
+def read_path_data(svg_files_path):
+    """Reads the 'd' attribute of every path in the SVG folder."""
+    path_data = []
+    for filename in os.listdir(svg_files_path):
+        if filename.endswith(".svg"):
+            root = ET.parse(os.path.join(svg_files_path, filename)).getroot()
+            for element in root.iter('{http://www.w3.org/2000/svg}path'):
+                path_data.append(element.attrib.get('d', ''))
+    return path_data
+
+
+def time_parser(parse, path_data, repeat=3):
+    """Returns the best time out of repeat runs of parse over all path data."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for d in path_data:
+            parse(d)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_same_outlines(path_data):
+    for d in path_data:
+        expected = GlyphOutline.from_svg_path_data(d)
+        outline = GlyphOutline.from_path_data(d)
+        if not (np.array_equal(expected.points, outline.points)
+                and np.array_equal(expected.types, outline.types)
+                and np.array_equal(expected.contour_ends, outline.contour_ends)):
+            raise ValueError(f"potrace parser and svg.path disagree on: {d[:80]}")
+
+
+def main():
+    svg_files_path = "../../data/derge_font/svg"
+    path_data = read_path_data(svg_files_path)
+    check_same_outlines(path_data)
+
+    svg_path_time = time_parser(GlyphOutline.from_svg_path_data, path_data)
+    potrace_time = time_parser(GlyphOutline.from_path_data, path_data)
+    print(f"paths parsed: {len(path_data)}")
+    print(f"svg.path: {svg_path_time:.3f}s")
+    print(f"potrace parser: {potrace_time:.3f}s")
+    print(f"speedup: {svg_path_time / potrace_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from collections import namedtuple
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+
+INDEX_NAME = "index.jsonl"
+SHARD_MAX_BYTES = 256 * 1024 ** 2
+
+# name is the cleaned glyph's <stack>_<width>_<lsb>_<rsb>; offset is where its packed rows start in the shard file
+BitmapRecord = namedtuple(
+    "BitmapRecord", ["name", "stack", "shard", "offset", "width", "height", "box", "glyph_metrics"])
+
+
+def shard_file_name(shard):
+    return f"bitmaps-{shard:03d}.bin"
+
+
+def packed_size(width, height):
+    return (width + 7) // 8 * height
+
+
+class BitmapStore:
+    """Cleaned 1-bit glyph bitmaps with their metrics, in a few append-only shard files and a JSONL index.
+
+    Each bitmap is stored cropped, its rows packed 8 pixels to a byte, the layout of a binary
+    PBM raster, so pbm() hands potrace the stored bytes behind a header. Shard files are read
+    through memory maps; a new one is started once the current one grows past shard_max_bytes.
+    A later record of the same name replaces the earlier one, like the manifest. Index lines a
+    crash left half written, or pointing past the end of their shard, are dropped from the index
+    on resume, before later bitmaps fill that space. Without resume the store starts empty.
+    """
+
+    def __init__(self, store_dir, resume=False, shard_max_bytes=SHARD_MAX_BYTES):
+        self.store_dir = store_dir
+        self.shard_max_bytes = shard_max_bytes
+        self.index_path = os.path.join(store_dir, INDEX_NAME)
+        self.records = {}
+        self.stacks = {}
+        self.maps = {}
+        self.lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+        if resume:
+            self._load_index()
+        else:
+            for file_name in os.listdir(store_dir):
+                if file_name == INDEX_NAME or (file_name.startswith("bitmaps-") and file_name.endswith(".bin")):
+                    os.remove(os.path.join(store_dir, file_name))
+        self.shard = max((record.shard for record in self.records.values()), default=0)
+        self.shard_file = open(self._shard_path(self.shard), 'ab')
+        self.index_file = open(self.index_path, 'a', encoding='utf-8')
+        if self.index_file.tell() and not self._index_ends_with_newline():
+            # end the line a crash left half written, so the next record starts a line of its own
+            self.index_file.write("\n")
+
+    def _index_ends_with_newline(self):
+        with open(self.index_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _shard_path(self, shard):
+        return os.path.join(self.store_dir, shard_file_name(shard))
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        shard_sizes = {}
+        dropped = 0
+        with open(self.index_path, encoding='utf-8') as f:
+            for index_line in f:
+                try:
+                    record = BitmapRecord(**json.loads(index_line))
+                except (ValueError, TypeError):
+                    dropped += 1
+                    continue
+                if record.shard not in shard_sizes:
+                    shard_path = self._shard_path(record.shard)
+                    shard_sizes[record.shard] = os.path.getsize(shard_path) if os.path.exists(shard_path) else 0
+                if record.offset + packed_size(record.width, record.height) <= shard_sizes[record.shard]:
+                    self._apply(record)
+                else:
+                    dropped += 1
+        if dropped:
+            # bitmaps added later are appended after the missing bytes and would bring the dropped records back
+            self._compact_index()
+
+    def _compact_index(self):
+        fd, temp_path = tempfile.mkstemp(suffix=".jsonl", dir=self.store_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.index_path)
+
+    def _apply(self, record):
+        previous = self.records.get(record.name)
+        if previous is not None:
+            self.stacks[previous.stack].remove(previous.name)
+        self.records[record.name] = record
+        self.stacks.setdefault(record.stack, []).append(record.name)
+
+    def add(self, name, stack, bitmap, box=None, glyph_metrics=None):
+        """Packs and appends a boolean ink bitmap (True is ink) and returns its record."""
+        height, width = bitmap.shape
+        packed = np.packbits(bitmap, axis=1)
+        with self.lock:
+            if self.shard_file.tell() and self.shard_file.tell() + packed.nbytes > self.shard_max_bytes:
+                self.shard_file.close()
+                self.shard += 1
+                self.shard_file = open(self._shard_path(self.shard), 'ab')
+            record = BitmapRecord(name, stack, self.shard, self.shard_file.tell(), width, height,
+                                  list(box) if box is not None else None, glyph_metrics)
+            self.shard_file.write(packed.tobytes())
+            # the bitmap is on disk before the index line that points at it
+            self.shard_file.flush()
+            self.index_file.write(json.dumps(record._asdict(), ensure_ascii=False) + "\n")
+            self.index_file.flush()
+            self._apply(record)
+        return record
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def names(self, stack=None):
+        """Returns the names of the stored bitmaps, or of those of one stack, in the order they were added."""
+        if stack is None:
+            return list(self.records)
+        return list(self.stacks.get(stack, ()))
+
+    def record(self, name):
+        return self.records[name]
+
+    def packed(self, name):
+        """Returns the packed rows of a bitmap as a read-only (height, bytes per row) view of the shard file."""
+        record = self.records[name]
+        end = record.offset + packed_size(record.width, record.height)
+        with self.lock:
+            shard_map = self.maps.get(record.shard)
+            if shard_map is None or len(shard_map) < end:
+                if record.shard == self.shard:
+                    self.shard_file.flush()
+                shard_map = np.memmap(self._shard_path(record.shard), dtype=np.uint8, mode='r')
+                self.maps[record.shard] = shard_map
+        return shard_map[record.offset:end].reshape(record.height, (record.width + 7) // 8)
+
+    def bitmap(self, name):
+        """Returns a bitmap as the boolean array it was added as."""
+        record = self.records[name]
+        return np.unpackbits(self.packed(name), axis=1, count=record.width).astype(bool)
+
+    def pbm(self, name):
+        """Returns a bitmap as binary PBM bytes, made of its stored rows as they are."""
+        record = self.records[name]
+        return b"P4\n%d %d\n" % (record.width, record.height) + self.packed(name).tobytes()
+
+    def close(self):
+        self.shard_file.close()
+        self.index_file.close()
+        self.maps.clear()
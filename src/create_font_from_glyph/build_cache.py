@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+# numberOfContours, xMin, yMin, xMax, yMax at the start of every non-empty glyf entry
+GLYPH_HEADER = struct.Struct(">hhhhh")
+
+
+def glyph_metrics(glyph_data):
+    """Returns the bounds, contour and point counts of compiled glyf bytes of a simple glyph."""
+    if not glyph_data:
+        return {"bounds": None, "contours": 0, "points": 0}
+    number_of_contours, x_min, y_min, x_max, y_max = GLYPH_HEADER.unpack_from(glyph_data)
+    if number_of_contours <= 0:
+        return {"bounds": [x_min, y_min, x_max, y_max], "contours": 0, "points": 0}
+    # endPtsOfContours follows the header; its last entry is the index of the last point
+    last_point = struct.unpack_from(">H", glyph_data, GLYPH_HEADER.size + 2 * (number_of_contours - 1))[0]
+    return {"bounds": [x_min, y_min, x_max, y_max], "contours": number_of_contours, "points": last_point + 1}
+
+
+class GlyphBuildCache:
+    """Compiled glyf bytes and metrics of SVG files, keyed by the SHA-1 of the SVG content and the build parameters.
+
+    Changing a parameter changes every key, so nothing compiled with other parameters is reused.
+    save() keeps only the entries used by the current build, which prunes removed glyphs.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = json.dumps(params, sort_keys=True).encode('utf-8')
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                try:
+                    self.entries = json.load(f)
+                except ValueError:
+                    self.entries = {}
+
+    def key(self, svg_file_path):
+        with open(svg_file_path, 'rb') as f:
+            return hashlib.sha1(self.params + b"\0" + f.read()).hexdigest()
+
+    def get(self, key):
+        """Returns the compiled glyf bytes for key, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return base64.b64decode(entry["glyf"])
+
+    def put(self, key, glyph_data):
+        self.entries[key] = {"glyf": base64.b64encode(glyph_data).decode('ascii'), **glyph_metrics(glyph_data)}
+
+    def save(self, used_keys):
+        """Writes the entries in used_keys atomically and returns how many others were pruned."""
+        used_keys = set(used_keys)
+        entries = {key: entry for key, entry in self.entries.items() if key in used_keys}
+        pruned = len(self.entries) - len(entries)
+        self.entries = entries
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(self.path) or ".")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.path)
+        return pruned
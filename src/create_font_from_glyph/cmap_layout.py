@@ -0,0 +1,78 @@
+import struct
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
+
+# glyphs without codepoints sort after the stacks
+NO_CODEPOINT = 0x110000
+
+
+def glyph_order_key(glyph):
+    """Sorts (glyph, codepoints, glyph_name, ...) tuples: single codepoints first, then stacks by their codepoints."""
+    codepoints = glyph[1]
+    return (len(codepoints) != 1, codepoints[0] if codepoints else NO_CODEPOINT, tuple(codepoints))
+
+
+def order_glyphs(glyphs):
+    """Returns the glyphs ordered by codepoint, then by stack.
+
+    Single-codepoint glyphs with consecutive codepoints get consecutive glyph IDs, so each run
+    is a single cmap segment, and the stacks of a base letter sit together in glyf and loca.
+    The sort is stable, so of two glyphs with the same name the later one still wins.
+    """
+    return sorted(glyphs, key=glyph_order_key)
+
+
+def build_character_map(glyphs):
+    """Maps the codepoint of each single-codepoint glyph to its name; stacks are reached through GSUB."""
+    character_map = {}
+    for glyph in glyphs:
+        codepoints, glyph_name = glyph[1], glyph[2]
+        if len(codepoints) == 1:
+            character_map[codepoints[0]] = glyph_name
+    return character_map
+
+
+def build_cmap_table(character_map):
+    """Returns a cmap table with a Windows BMP format 4 subtable, plus format 12 when codepoints go past the BMP."""
+    bmp_map = {codepoint: glyph_name for codepoint, glyph_name in character_map.items() if codepoint <= 0xFFFF}
+    subtables = [_subtable(4, 3, 1, bmp_map)]
+    if len(bmp_map) < len(character_map):
+        subtables.append(_subtable(12, 3, 10, character_map))
+    cmap_table = newTable('cmap')
+    cmap_table.tableVersion = 0
+    cmap_table.tables = sorted(subtables, key=lambda x: (x.platformID, x.platEncID, x.language, x.format))
+    return cmap_table
+
+
+def _subtable(table_format, platform_id, plat_enc_id, character_map):
+    subtable = CmapSubtable.newSubtable(table_format)
+    subtable.platformID = platform_id
+    subtable.platEncID = plat_enc_id
+    subtable.language = 0
+    subtable.cmap = dict(character_map)
+    return subtable
+
+
+def cmap_layout_stats(glyph_order, character_map):
+    """Returns (cmap size in bytes, number of format 4 segments, number of format 12 groups) for a glyph order."""
+    font = TTFont()
+    font.setGlyphOrder(glyph_order)
+    font['cmap'] = build_cmap_table(character_map)
+    size = len(font['cmap'].compile(font))
+    segments = groups = 0
+    for subtable in font['cmap'].tables:
+        data = subtable.compile(font)
+        if subtable.format == 4:
+            # format, length, language, segCountX2
+            segments = struct.unpack_from(">H", data, 6)[0] // 2
+        elif subtable.format == 12:
+            # format, reserved, length, language, numGroups
+            groups = struct.unpack_from(">L", data, 12)[0]
+    return size, segments, groups
+
+
+def unique_glyph_order(base_glyph_order, glyphs):
+    """Returns the glyph order of a font made of the base glyphs followed by the given ones."""
+    glyph_order = dict.fromkeys(base_glyph_order)
+    glyph_order.update(dict.fromkeys(glyph[2] for glyph in glyphs))
+    return list(glyph_order)
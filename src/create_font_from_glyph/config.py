@@ -1,8 +1,11 @@
 import csv
 import os
 import boto3
+from botocore.config import Config
 
 MONLAM_AI_OCR_BUCKET = "monlam.ai.ocr"
+# shared by the concurrent image downloads in pipeline_for_svg_creation
+S3_MAX_POOL_CONNECTIONS = 32
 
 aws_credentials_file = os.path.join(os.getenv('USERPROFILE'), '.aws', 'credential', 'tenkal_accessKeys.csv')
 aws_access_key_id = None
@@ -34,7 +37,8 @@ except Exception as e:
     print("error while creating Boto3 session:", e)
     exit(1)
 try:
-    monlam_ai_ocr_s3_client = monlam_ai_ocr_session .client('s3')
+    monlam_ai_ocr_s3_client = monlam_ai_ocr_session.client(
+        's3', config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS))
     monlam_ai_ocr_s3_resource = monlam_ai_ocr_session.resource('s3')
     monlam_ai_ocr_bucket = monlam_ai_ocr_s3_resource.Bucket(MONLAM_AI_OCR_BUCKET)
 except Exception as e:
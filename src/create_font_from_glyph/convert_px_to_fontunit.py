@@ -21,7 +21,12 @@ def create_font_units(directory):
             results.append((glyph_width, lsb, rsb,))
     return results
 
-results = create_font_units("../../data/derge_font/svg")
-for glyph_width, lsb, rsb in results:
-    print(f"Glyph width: {glyph_width}, LSB: {lsb}, RSB: {rsb}")
+def record_font_units(record):
+    """Converts the pixel metrics of a glyph manifest record to (glyph_width, lsb, rsb) font units."""
+    return tuple(convert_pixel_to_glyph_unit(record[key]) for key in ("width_px", "lsb_px", "rsb_px"))
+
+if __name__ == "__main__":
+    results = create_font_units("../../data/derge_font/svg")
+    for glyph_width, lsb, rsb in results:
+        print(f"Glyph width: {glyph_width}, LSB: {lsb}, RSB: {rsb}")
 
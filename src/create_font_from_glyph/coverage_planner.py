@@ -0,0 +1,143 @@
+from collections import Counter
+from pathlib import Path
+import argparse
+import json
+import os
+from annotation_index import AnnotationIndex
+from glyph_manifest import load_glyph_records
+from pipeline_for_svg_creation import annotation_index_dir, jsonl_dir, samples_per_image_id, svg_dir
+
+work_queue_path = "../../data/pecing_font/Pecing_test_10_glyphs/work_queue.jsonl"
+# key of the trie node where a stack ends; codepoints are never negative
+_END = -1
+
+
+class StackTrie:
+    """A set of stacks stored as paths of codepoints, so stacks sharing a base letter share nodes."""
+
+    def __init__(self, stacks=()):
+        self.root = {}
+        self.size = 0
+        for stack in stacks:
+            self.add(stack)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, stack):
+        node = self.root
+        for char in stack:
+            node = node.setdefault(ord(char), {})
+        if _END not in node:
+            node[_END] = True
+            self.size += 1
+
+    def _node(self, stack):
+        node = self.root
+        for char in stack:
+            node = node.get(ord(char))
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, stack):
+        node = self._node(stack)
+        return node is not None and _END in node
+
+    def longest_prefix(self, stack):
+        """Returns the longest stack in the trie that stack starts with, or an empty string."""
+        node = self.root
+        longest = ""
+        for length, char in enumerate(stack, 1):
+            node = node.get(ord(char))
+            if node is None:
+                break
+            if _END in node:
+                longest = stack[:length]
+        return longest
+
+
+def is_good_glyph(svg_dir, record):
+    """A glyph is good when its SVG is there and not empty and the cleaned glyph had ink."""
+    svg_path = os.path.join(svg_dir, record["svg"])
+    return record["width_px"] > 0 and os.path.exists(svg_path) and os.path.getsize(svg_path) > 0
+
+
+def covered_stacks(svg_dir):
+    """Returns a StackTrie of the stacks that already have a good glyph in svg_dir."""
+    if not os.path.isdir(svg_dir):
+        return StackTrie()
+    return StackTrie(record["stack"] for record in load_glyph_records(svg_dir) if is_good_glyph(svg_dir, record))
+
+
+def read_stack_list(path):
+    """Reads one stack per line, as get_tibetan_char.py writes them."""
+    with open(path, encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def plan_work(jsonl_paths, covered, targets=None, samples_per_image_id=samples_per_image_id):
+    """Returns (work queue, counts, stacks queued): the accepted lines of the stacks without a good glyph.
+
+    With targets, only those stacks are queued. Like the SVG pipeline, at most samples_per_image_id
+    lines are kept per image ID, but only lines that are needed count towards it. Stacks come from
+    the annotation index, so only the queued lines are decoded.
+    """
+    work_queue = []
+    counts = Counter()
+    image_id_counts = Counter()
+    queued_stacks = set()
+    for jsonl_path in jsonl_paths:
+        index = AnnotationIndex.load(jsonl_path, annotation_index_dir)
+        queued = []
+        for entry in index.entries:
+            image_id = entry.id.split("_")[0]
+            if entry.stack in covered:
+                counts["covered"] += 1
+            elif targets is not None and entry.stack not in targets:
+                counts["not targeted"] += 1
+            elif image_id_counts[image_id] >= samples_per_image_id:
+                counts["over the sample cap"] += 1
+            else:
+                image_id_counts[image_id] += 1
+                queued_stacks.add(entry.stack)
+                queued.append(entry)
+        work_queue.extend(index.read_lines(queued))
+    counts["queued"] = len(work_queue)
+    return work_queue, counts, queued_stacks
+
+
+def write_work_queue(work_queue, path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in work_queue:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+def main(svg_dir=svg_dir, jsonl_dir=jsonl_dir, targets_path=None, output_path=work_queue_path):
+    covered = covered_stacks(svg_dir)
+    targets = read_stack_list(targets_path) if targets_path is not None else None
+    work_queue, counts, queued_stacks = plan_work(sorted(Path(jsonl_dir).iterdir()), covered, targets)
+    write_work_queue(work_queue, output_path)
+
+    print(f"stacks with a good glyph: {len(covered)}")
+    print(f"accepted lines: {', '.join(f'{count} {label}' for label, count in counts.items())}")
+    print(f"stacks to trace: {len(queued_stacks)}, work queue written to {output_path}")
+    if targets is not None:
+        missing = sorted(stack for stack in targets if stack not in covered and stack not in queued_stacks)
+        print(f"target stacks without a glyph or an accepted annotation: {len(missing)}")
+        for stack in missing:
+            prefix = covered.longest_prefix(stack)
+            print(f"  {stack}" + (f" (has {prefix})" if prefix else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Queue the accepted annotation lines of the stacks that have no good glyph yet.")
+    parser.add_argument("--svg-dir", default=svg_dir, help="folder of the SVG glyphs made so far")
+    parser.add_argument("--jsonl-dir", default=jsonl_dir, help="folder of the annotation batches")
+    parser.add_argument("--targets", help="text file of the stacks the font needs, one per line")
+    parser.add_argument("--output", default=work_queue_path, help="JSONL work queue for pipeline_for_svg_creation.py")
+    args = parser.parse_args()
+    main(args.svg_dir, args.jsonl_dir, args.targets, args.output)
@@ -0,0 +1,82 @@
+def expanded_glyph_metrics(glyf_table, glyph_name):
+    """Returns the bounds, contour and point counts of a glyph by expanding it, for glyphs without stored metrics."""
+    glyph = glyf_table[glyph_name]
+    if glyph.numberOfContours == 0:
+        return {"bounds": None, "contours": 0, "points": 0}
+    if glyph.numberOfContours < 0 and not hasattr(glyph, "xMax"):
+        glyph.recalcBounds(glyf_table)
+    bounds = [glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax]
+    if glyph.numberOfContours > 0:
+        points, contours = glyph.getMaxpValues()
+        return {"bounds": bounds, "contours": contours, "points": points}
+    points, contours, depth = glyph.getCompositeMaxpValues(glyf_table)
+    return {"bounds": bounds, "contours": contours, "points": points,
+            "composite": True, "components": len(glyph.components), "depth": depth}
+
+
+def recalc_font_metrics(font, glyph_metrics):
+    """Sets the head bounds and flags, hhea extents and maxp maxima that fontTools recalculates on save.
+
+    glyph_metrics maps glyph names to the metrics of their compiled glyf bytes; other glyphs are
+    expanded. Save the font with recalcBBoxes=False afterwards, so the glyf table is written
+    straight from the compiled bytes instead of expanding and recompiling every glyph.
+    """
+    glyf_table = font['glyf']
+    hmtx_table = font['hmtx']
+    head_table = font['head']
+    maxp_table = font['maxp']
+    bounds_union = None
+    maxima = {"points": 0, "contours": 0, "composite_points": 0, "composite_contours": 0, "components": 0, "depth": 0}
+    all_x_min_is_lsb = True
+    min_lsb = min_rsb = x_max_extent = None
+
+    for glyph_name in font.getGlyphOrder():
+        metrics = glyph_metrics.get(glyph_name)
+        if metrics is None:
+            metrics = expanded_glyph_metrics(glyf_table, glyph_name)
+        bounds = metrics["bounds"]
+        if bounds is None or (metrics["contours"] == 0 and not metrics.get("composite")):
+            continue
+        x_min, y_min, x_max, y_max = bounds
+        advance_width, lsb = hmtx_table[glyph_name]
+        all_x_min_is_lsb = all_x_min_is_lsb and lsb == x_min
+        if bounds_union is None:
+            bounds_union = list(bounds)
+        else:
+            bounds_union = [min(bounds_union[0], x_min), min(bounds_union[1], y_min),
+                            max(bounds_union[2], x_max), max(bounds_union[3], y_max)]
+        if metrics.get("composite"):
+            maxima["composite_points"] = max(maxima["composite_points"], metrics["points"])
+            maxima["composite_contours"] = max(maxima["composite_contours"], metrics["contours"])
+            maxima["components"] = max(maxima["components"], metrics["components"])
+            maxima["depth"] = max(maxima["depth"], metrics["depth"])
+        else:
+            maxima["points"] = max(maxima["points"], metrics["points"])
+            maxima["contours"] = max(maxima["contours"], metrics["contours"])
+
+        bounds_width = x_max - x_min
+        rsb = advance_width - lsb - bounds_width
+        min_lsb = lsb if min_lsb is None else min(min_lsb, lsb)
+        min_rsb = rsb if min_rsb is None else min(min_rsb, rsb)
+        x_max_extent = lsb + bounds_width if x_max_extent is None else max(x_max_extent, lsb + bounds_width)
+
+    head_table.xMin, head_table.yMin, head_table.xMax, head_table.yMax = bounds_union or (0, 0, 0, 0)
+    if all_x_min_is_lsb:
+        head_table.flags = head_table.flags | 0x2
+    else:
+        head_table.flags = head_table.flags & ~0x2
+
+    maxp_table.numGlyphs = len(glyf_table)
+    maxp_table.maxPoints = maxima["points"]
+    maxp_table.maxContours = maxima["contours"]
+    maxp_table.maxCompositePoints = maxima["composite_points"]
+    maxp_table.maxCompositeContours = maxima["composite_contours"]
+    maxp_table.maxComponentElements = maxima["components"]
+    maxp_table.maxComponentDepth = maxima["depth"]
+
+    if 'hhea' in font:
+        hhea_table = font['hhea']
+        hhea_table.advanceWidthMax = max(advance_width for advance_width, _ in hmtx_table.metrics.values())
+        hhea_table.minLeftSideBearing = min_lsb or 0
+        hhea_table.minRightSideBearing = min_rsb or 0
+        hhea_table.xMaxExtent = x_max_extent or 0
@@ -0,0 +1,95 @@
+from collections import namedtuple
+import numpy as np
+from PIL import Image, ImageDraw
+
+# rgba and bitmap cover only box, the (left, upper, right, lower) crop of the page around the glyph;
+# the edges are page columns
+CleanedGlyph = namedtuple("CleanedGlyph", ["rgba", "bitmap", "left_edge", "right_edge", "box"])
+
+
+def polygon_mask(size, polygon_points):
+    """Rasterizes the annotation polygon into a boolean mask of the given (width, height)."""
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).polygon(polygon_points, fill=255)
+    return np.asarray(mask) > 0
+
+
+def crop_box(polygon_points, size, margin=4):
+    """Returns the bounding box of the polygon plus margin, clipped to the page size."""
+    xs = [x for x, _ in polygon_points]
+    ys = [y for _, y in polygon_points]
+    width, height = size
+    left = max(int(np.floor(min(xs))) - margin, 0)
+    upper = max(int(np.floor(min(ys))) - margin, 0)
+    right = min(int(np.ceil(max(xs))) + margin + 1, width)
+    lower = min(int(np.ceil(max(ys))) + margin + 1, height)
+    return left, upper, max(right, left), max(lower, upper)
+
+
+def find_edges(bitmap, x_offsets=0, page_widths=None):
+    """Returns the left and right ink columns of (..., H, W) bitmaps as page columns.
+
+    The bitmaps may be crops starting at page column x_offsets. Like before cropping, the
+    first and last columns of the page are ignored. Images without ink get -1 for both edges.
+    """
+    width = bitmap.shape[-1]
+    x_offsets = np.asarray(x_offsets)[..., None]
+    page_widths = np.asarray(width if page_widths is None else page_widths)[..., None]
+    page_columns = np.arange(width) + x_offsets
+    columns = bitmap.any(axis=-2) & (page_columns > 0) & (page_columns < page_widths - 1)
+    has_ink = columns.any(axis=-1)
+    left_edge = np.argmax(columns, axis=-1) + x_offsets[..., 0]
+    right_edge = width - 1 - np.argmax(columns[..., ::-1], axis=-1) + x_offsets[..., 0]
+    return np.where(has_ink, left_edge, -1), np.where(has_ink, right_edge, -1)
+
+
+def clean_glyph_pixels(pixels, masks, threshold=128, x_offsets=0, page_widths=None):
+    """Cleans stacked RGB pixels (..., H, W, 3) with their polygon masks (..., H, W) in one pass.
+
+    Pixels outside the mask turn white, white pixels become transparent and pixels
+    darker than threshold are the ink of the 1-bit bitmap.
+    """
+    rgba = np.empty(pixels.shape[:-1] + (4,), np.uint8)
+    rgba[..., :3] = 255
+    np.copyto(rgba[..., :3], pixels, where=masks[..., None])
+    # widened first: NumPy 1.x keeps uint8 * uint32 scalar products in uint8, which wraps around
+    red, green, blue = np.moveaxis(rgba[..., :3].astype(np.uint32), -1, 0)
+    # same integer luma weights as PIL's RGB to L conversion
+    luma = (red * 19595 + green * 38470 + blue * 7471 + 0x8000) >> 16
+    bitmap = luma < threshold
+    rgba[..., 3] = np.where((red & green & blue) == 255, np.uint8(0), np.uint8(255))
+    left_edges, right_edges = find_edges(bitmap, x_offsets, page_widths)
+    return rgba, bitmap, left_edges, right_edges
+
+
+def clean_glyph_images(images, polygons, threshold=128, margin=4):
+    """Cleans a batch of page images, each with its glyph polygon.
+
+    Only the polygon's bounding box plus margin is cleaned, so the work scales with the
+    glyph rather than the page. Crops of the same size are stacked and cleaned together.
+    """
+    results = [None] * len(images)
+    boxes = [crop_box(polygon, image.size, margin) for image, polygon in zip(images, polygons)]
+    batches = {}
+    for index, (left, upper, right, lower) in enumerate(boxes):
+        batches.setdefault((right - left, lower - upper), []).append(index)
+
+    for size, indices in batches.items():
+        pixels = np.stack([np.asarray(images[index].crop(boxes[index]).convert("RGB")) for index in indices])
+        masks = np.stack([
+            polygon_mask(size, [(x - boxes[index][0], y - boxes[index][1]) for x, y in polygons[index]])
+            for index in indices])
+        x_offsets = np.array([boxes[index][0] for index in indices])
+        page_widths = np.array([images[index].size[0] for index in indices])
+        rgba, bitmap, left_edges, right_edges = clean_glyph_pixels(pixels, masks, threshold, x_offsets, page_widths)
+        for batch_index, index in enumerate(indices):
+            left_edge = int(left_edges[batch_index])
+            right_edge = int(right_edges[batch_index])
+            if left_edge < 0:
+                left_edge = right_edge = None
+            results[index] = CleanedGlyph(rgba[batch_index], bitmap[batch_index], left_edge, right_edge, boxes[index])
+    return results
+
+
+def clean_glyph_image(image, polygon_points, threshold=128, margin=4):
+    return clean_glyph_images([image], [polygon_points], threshold, margin)[0]
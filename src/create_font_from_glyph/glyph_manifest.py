@@ -0,0 +1,92 @@
+import json
+import os
+import re
+import threading
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# <stack>_<width>_<lsb>_<rsb>, the metrics get_image_output_path puts in the file name
+FILENAME_METRICS = re.compile(r'^(.*)_(-?\d+)_(-?\d+)_(-?\d+)$')
+
+
+def manifest_path(svg_dir):
+    return os.path.join(svg_dir, MANIFEST_NAME)
+
+
+def generate_glyph_name(codepoints):
+    return 'uni' + ''.join(f"{codepoint:04X}" for codepoint in codepoints)
+
+
+class GlyphManifestWriter:
+    """Appends one JSONL record per written SVG, next to the SVGs it describes.
+
+    Records hold the stack, codepoints, glyph name, pixel width/LSB/RSB, headline and the
+    SHA-1 of the source image, so font assembly doesn't have to parse file names.
+    """
+
+    def __init__(self, path, resume=False):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def glyph_record(svg_name, stack, width_px, lsb_px, rsb_px, headline=None, source=None, source_sha1=None):
+    codepoints = [ord(char) for char in stack]
+    return {
+        "svg": svg_name,
+        "stack": stack,
+        "codepoints": codepoints,
+        "glyph_name": generate_glyph_name(codepoints),
+        "width_px": width_px,
+        "lsb_px": lsb_px,
+        "rsb_px": rsb_px,
+        "headline": headline,
+        "source": source,
+        "source_sha1": source_sha1,
+    }
+
+
+def record_from_filename(svg_name):
+    """Builds a record from the metrics in an SVG file name, for SVGs written before the manifest."""
+    stem = os.path.splitext(svg_name)[0]
+    match = FILENAME_METRICS.match(stem)
+    if match is None:
+        raise ValueError(f"no metrics in SVG file name '{svg_name}'")
+    stack, width_px, lsb_px, rsb_px = match.groups()
+    return glyph_record(svg_name, stack, int(width_px), int(lsb_px), int(rsb_px))
+
+
+def read_manifest(svg_dir):
+    """Returns the manifest records keyed by SVG file name, or an empty dict when there is no manifest.
+
+    A later record for the same SVG replaces the earlier one, like the file it describes.
+    """
+    records = {}
+    path = manifest_path(svg_dir)
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as f:
+        for manifest_line in f:
+            try:
+                record = json.loads(manifest_line)
+            except ValueError:
+                continue
+            records[record["svg"]] = record
+    return records
+
+
+def load_glyph_records(svg_dir):
+    """Returns the records of the SVGs in svg_dir: the manifest's, or ones read from the file names without it."""
+    manifest = read_manifest(svg_dir)
+    if manifest:
+        return [record for svg_name, record in manifest.items() if os.path.exists(os.path.join(svg_dir, svg_name))]
+    return [record_from_filename(filename) for filename in os.listdir(svg_dir) if filename.endswith(".svg")]
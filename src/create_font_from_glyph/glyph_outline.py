@@ -0,0 +1,385 @@
+from xml.etree import ElementTree as ET
+from array import array
+import numpy as np
+from svg.path import parse_path
+from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.tables import ttProgram
+from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph, GlyphCoordinates, flagOnCurve, flagCubic
+from potrace_path import (MOVE, LINE, CURVE_CONTROL, CURVE, parse_potrace_path_data, parse_svg_transform,
+                          compose_transforms)
+
+# joins that turn by more than this many degrees are corners, which simplify() never fits a curve across
+CORNER_ANGLE = 15
+# share of simplify()'s tolerance left to sampling the curves it measures
+SAMPLING_ERROR = 0.02
+MIN_CURVE_STEPS = 4
+MAX_CURVE_STEPS = 256
+# the most segments simplify() replaces with one, and the number of least squares fits it tries for them
+MAX_RUN = 32
+FIT_ITERATIONS = 4
+# data segments on each side of a fitted curve's sample that it is measured against
+FIT_WINDOW = 8
+
+
+class GlyphOutline:
+    """Glyph contours stored as NumPy arrays: points, per-point segment types and contour end indices."""
+
+    def __init__(self, points=None, types=None, contour_ends=None):
+        self.points = np.zeros((0, 2)) if points is None else np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.types = np.zeros(0, np.uint8) if types is None else np.asarray(types, dtype=np.uint8)
+        self.contour_ends = np.zeros(0, np.int64) if contour_ends is None else np.asarray(contour_ends, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.points)
+
+    @classmethod
+    def from_path_data(cls, path_data):
+        """Parses an SVG path 'd' attribute, using the fast potrace parser when it can."""
+        parsed = parse_potrace_path_data(path_data)
+        if parsed is None:
+            return cls.from_svg_path_data(path_data)
+        return cls(*parsed)
+
+    @classmethod
+    def from_svg_path_data(cls, path_data):
+        """Parses an SVG path 'd' attribute with svg.path."""
+        points = []
+        types = []
+        contour_ends = []
+        for segment in parse_path(path_data):
+            name = segment.__class__.__name__
+            if name == 'Move':
+                if points:
+                    contour_ends.append(len(points) - 1)
+                points.append((segment.end.real, segment.end.imag))
+                types.append(MOVE)
+            elif name == 'Line':
+                points.append((segment.end.real, segment.end.imag))
+                types.append(LINE)
+            elif name == 'CubicBezier':
+                points.extend(((segment.control1.real, segment.control1.imag),
+                               (segment.control2.real, segment.control2.imag),
+                               (segment.end.real, segment.end.imag)))
+                types.extend((CURVE_CONTROL, CURVE_CONTROL, CURVE))
+        if points:
+            contour_ends.append(len(points) - 1)
+        return cls(points, types, contour_ends)
+
+    @classmethod
+    def concatenate(cls, outlines):
+        """Joins several outlines into one, keeping their contours in order."""
+        outlines = [outline for outline in outlines if len(outline)]
+        if not outlines:
+            return cls()
+        offsets = np.cumsum([0] + [len(outline) for outline in outlines[:-1]])
+        return cls(np.concatenate([outline.points for outline in outlines]),
+                   np.concatenate([outline.types for outline in outlines]),
+                   np.concatenate([outline.contour_ends + offset for outline, offset in zip(outlines, offsets)]))
+
+    def bounds(self):
+        """Returns (min_x, min_y, max_x, max_y) over all points, control points included."""
+        if not len(self.points):
+            return None
+        min_x, min_y = self.points.min(axis=0).tolist()
+        max_x, max_y = self.points.max(axis=0).tolist()
+        return min_x, min_y, max_x, max_y
+
+    def translate(self, dx, dy):
+        return GlyphOutline(self.points + (dx, dy), self.types, self.contour_ends)
+
+    def transform(self, matrix):
+        """Applies a 2x3 affine matrix to every point."""
+        return GlyphOutline(self.points @ matrix[:, :2].T + matrix[:, 2], self.types, self.contour_ends)
+
+    def draw(self, pen):
+        """Draws the outline with any fontTools segment pen."""
+        points = [tuple(point) for point in self.points.tolist()]
+        types = self.types.tolist()
+        start = 0
+        for end in self.contour_ends.tolist():
+            pen.moveTo(points[start])
+            i = start + 1
+            while i <= end:
+                if types[i] == LINE:
+                    pen.lineTo(points[i])
+                    i += 1
+                else:
+                    pen.curveTo(points[i], points[i + 1], points[i + 2])
+                    i += 3
+            pen.closePath()
+            start = end + 1
+
+    def simplify(self, tolerance):
+        """Returns the outline drawn with fewer segments, within tolerance of the original everywhere.
+
+        Each contour is walked from its start point, and every run of segments that allows it is
+        replaced by a single line, or by a single cubic fitted to it by least squares. A run can
+        become a line when all of it lies within tolerance of the chord, which merges collinear
+        points, drops tiny segments and flattens flat curves. It can become a cubic when its
+        segments join smoothly, so corners stay sharp. Each replacement is measured against the
+        original run, both ways and densely enough to hold between samples, so the error doesn't add
+        up over replacements. The start and end points of every run are original on-curve points.
+        """
+        contours = []
+        start = 0
+        for end in self.contour_ends.tolist():
+            points, types = _simplify_contour(self.points[start:end + 1], self.types[start:end + 1], tolerance)
+            contours.append(GlyphOutline(points, types, [len(points) - 1]))
+            start = end + 1
+        return GlyphOutline.concatenate(contours)
+
+    def to_glyph(self):
+        """Builds the same glyf glyph as drawing into a TTGlyphPen, without going point by point."""
+        points = self.points
+        ends = self.contour_ends
+        starts = np.concatenate((np.zeros(1, np.int64), ends[:-1] + 1)) if len(ends) else ends
+
+        keep = np.ones(len(points), dtype=bool)
+        # TTGlyphPen drops one-point contours and a closing point that repeats the start point
+        single = starts == ends
+        keep[starts[single]] = False
+        closing = ends[~single][np.all(points[ends[~single]] == points[starts[~single]], axis=1)]
+        keep[closing] = False
+
+        counts = np.add.reduceat(keep.astype(np.int64), starts) if len(starts) else starts
+        new_ends = np.cumsum(counts) - 1
+
+        flags = np.where(self.types[keep] == CURVE_CONTROL, flagCubic, flagOnCurve).astype(np.uint8)
+        coordinates = np.floor(points[keep] + 0.5)
+
+        glyph = TTGlyph()
+        glyph.coordinates = GlyphCoordinates(coordinates.tolist())
+        glyph.endPtsOfContours = new_ends[~single].tolist()
+        glyph.flags = array("B", flags.tobytes())
+        glyph.numberOfContours = len(glyph.endPtsOfContours)
+        glyph.program = ttProgram.Program()
+        glyph.program.fromBytecode(b"")
+        return glyph
+
+    def to_quadratic_glyph(self, max_err):
+        """Builds a glyf glyph with quadratic curves; cu2qu keeps each converted cubic within max_err font units."""
+        pen = TTGlyphPen(None)
+        self.draw(Cu2QuPen(pen, max_err, reverse_direction=False))
+        return pen.glyph()
+
+    def to_charstring(self, width=None):
+        """Builds a CFF charstring that keeps the cubic curves as they are."""
+        pen = T2CharStringPen(width, None)
+        self.draw(pen)
+        return pen.getCharString()
+
+
+def _simplify_contour(points, types, tolerance):
+    """Returns the points and types of one contour simplified as GlyphOutline.simplify describes."""
+    segment_ends = np.flatnonzero(types[1:] != CURVE_CONTROL) + 1
+    if not len(segment_ends):
+        return points, types
+    segment_starts = np.r_[0, segment_ends[:-1]]
+    # the samples stand in for the curves, so what they miss of them comes off the tolerance
+    sampling_error = tolerance * SAMPLING_ERROR
+    tolerance -= sampling_error
+    samples, start_tangents, end_tangents = _sample_segments(points, segment_starts, segment_ends, types,
+                                                             sampling_error)
+    # a join turning by more than CORNER_ANGLE is a corner, which no fitted cubic may cross
+    smooth = np.einsum('ij,ij->i', end_tangents[:-1], start_tangents[1:]) >= np.cos(np.radians(CORNER_ANGLE))
+    point_counts = segment_ends - segment_starts
+
+    new_points = [points[0]]
+    new_types = [types[0]]
+    first = 0
+    while first < len(segment_ends):
+        # the segment as it is, unless a longer run can be drawn with fewer points
+        best_last, best_saving, best_controls = first, 0, None
+        run_points = 0
+        for last in range(first, min(first + MAX_RUN, len(segment_ends))):
+            run_points += point_counts[last]
+            data = np.concatenate([points[segment_starts[first]][None]] + samples[first:last + 1])
+            if _distance_to_chord(data).max() <= tolerance:
+                controls = ()
+            elif run_points > 3 and smooth[first:last].all():
+                controls = _fit_cubic(data, start_tangents[first], -end_tangents[last], tolerance, sampling_error)
+                if controls is None:
+                    break
+            elif last == first:
+                # a curve on its own can only become a line
+                continue
+            else:
+                break
+            saving = run_points - 1 - len(controls)
+            if saving >= best_saving:
+                best_last, best_saving, best_controls = last, saving, controls
+        if best_controls is None:
+            new_points.extend(points[segment_starts[first] + 1:segment_ends[first] + 1])
+            new_types.extend(types[segment_starts[first] + 1:segment_ends[first] + 1])
+        else:
+            new_points.extend(best_controls)
+            new_points.append(points[segment_ends[best_last]])
+            new_types.extend([CURVE_CONTROL, CURVE_CONTROL, CURVE] if best_controls else [LINE])
+        first = best_last + 1
+    return np.array(new_points), np.array(new_types, dtype=np.uint8)
+
+
+def _sample_segments(points, segment_starts, segment_ends, types, sampling_error):
+    """Returns the points along each segment after its start, and its unit start and end tangents.
+
+    A line is sampled at its end, a cubic at even steps of t, enough of them that the polyline
+    through its samples is within sampling_error of it.
+    """
+    samples = [points[end:end + 1] for end in segment_ends.tolist()]
+    start_tangents = points[segment_ends] - points[segment_starts]
+    end_tangents = start_tangents.copy()
+    curves = np.flatnonzero(types[segment_ends] == CURVE)
+    if len(curves):
+        controls = points[segment_ends[curves][:, None] - np.arange(3, -1, -1)]
+        for curve, curve_controls, steps in zip(curves.tolist(), controls, _curve_steps(controls, sampling_error)):
+            samples[curve] = _bernstein(np.linspace(0, 1, steps + 1)[1:]) @ curve_controls
+        # the first of the handles or chord that has a length, as a control point can sit on its end point
+        start_tangents[curves] = _first_nonzero(controls[:, 1:] - controls[:, :1])
+        end_tangents[curves] = _first_nonzero(controls[:, 3:] - controls[:, 2::-1])
+    return samples, _unit(start_tangents), _unit(end_tangents)
+
+
+def _curve_steps(controls, sampling_error):
+    """Returns how many even steps of t keep the polyline through each cubic within sampling_error of it.
+
+    A step h strays at most h * h / 8 times the largest second derivative, which a cubic has at an end.
+    """
+    second_derivatives = 6 * np.maximum(
+        np.hypot(*(controls[:, 2] - 2 * controls[:, 1] + controls[:, 0]).T),
+        np.hypot(*(controls[:, 3] - 2 * controls[:, 2] + controls[:, 1]).T))
+    steps = np.ceil(np.sqrt(second_derivatives / (8 * sampling_error)))
+    return np.clip(steps, MIN_CURVE_STEPS, MAX_CURVE_STEPS).astype(np.int64).tolist()
+
+
+def _first_nonzero(vectors):
+    """Returns the first vector of each row of vectors that isn't zero."""
+    nonzero = np.any(vectors != 0, axis=2)
+    return vectors[np.arange(len(vectors)), np.argmax(nonzero, axis=1)]
+
+
+def _unit(vectors):
+    lengths = np.hypot(*vectors.T)
+    return vectors / np.where(lengths > 0, lengths, 1)[:, None]
+
+
+def _bernstein(t):
+    """Returns the cubic Bernstein polynomials at t, one row per t."""
+    s = 1 - t
+    return np.stack((s ** 3, 3 * t * s ** 2, 3 * t ** 2 * s, t ** 3), axis=1)
+
+
+def _fit_cubic(data, start_tangent, end_tangent, tolerance, sampling_error):
+    """Fits a cubic from data[0] to data[-1] through the data points; returns its control points, or None.
+
+    The cubic leaves and enters along the unit tangents given, end_tangent pointing back from the
+    end, so it joins its neighbours as smoothly as the original did. Its handle lengths are solved
+    by least squares (Schneider's method), the data points' parameters refined by a Newton step
+    each time. The fit is accepted when every data point is within tolerance of the cubic, and
+    every point of the cubic within tolerance of the polyline through the data.
+    """
+    start, end = data[0], data[-1]
+    chord_lengths = np.r_[0, np.cumsum(np.hypot(*np.diff(data, axis=0).T))]
+    chord = np.hypot(*(end - start))
+    if chord_lengths[-1] <= 0 or chord <= 0:
+        return None
+    t = chord_lengths / chord_lengths[-1]
+    for _ in range(FIT_ITERATIONS):
+        basis = _bernstein(t)
+        start_handle = basis[:, 1:2] * start_tangent
+        end_handle = basis[:, 2:3] * end_tangent
+        rest = data - (basis[:, 0:1] + basis[:, 1:2]) * start - (basis[:, 2:3] + basis[:, 3:4]) * end
+        c00, c01, c11 = np.einsum('ij,ij', start_handle, start_handle), \
+            np.einsum('ij,ij', start_handle, end_handle), np.einsum('ij,ij', end_handle, end_handle)
+        x0, x1 = np.einsum('ij,ij', start_handle, rest), np.einsum('ij,ij', end_handle, rest)
+        determinant = c00 * c11 - c01 * c01
+        start_length = end_length = chord / 3
+        if abs(determinant) > 1e-12 * c00 * c11:
+            solved_start, solved_end = (x0 * c11 - x1 * c01) / determinant, (c00 * x1 - c01 * x0) / determinant
+            if solved_start > 1e-6 * chord and solved_end > 1e-6 * chord:
+                start_length, end_length = solved_start, solved_end
+        controls = np.array((start, start + start_length * start_tangent, end + end_length * end_tangent, end))
+
+        t = _newton_step(controls, data, t)
+        # the curve's point at a data point's parameter is at least as far from it as the nearest one
+        if np.hypot(*(_bernstein(t) @ controls - data).T).max() <= tolerance \
+                and _distance_from_cubic(controls, data, t, sampling_error) <= tolerance:
+            return controls[1], controls[2]
+    return None
+
+
+def _newton_step(controls, data, t):
+    """Moves each t towards the parameter of the cubic's point nearest its data point."""
+    p0, p1, p2, p3 = controls
+    s = (1 - t)[:, None]
+    u = t[:, None]
+    offset = _bernstein(t) @ controls - data
+    first = 3 * (s * s * (p1 - p0) + 2 * s * u * (p2 - p1) + u * u * (p3 - p2))
+    second = 6 * (s * (p2 - 2 * p1 + p0) + u * (p3 - 2 * p2 + p1))
+    numerator = np.einsum('ij,ij->i', offset, first)
+    denominator = np.einsum('ij,ij->i', first, first) + np.einsum('ij,ij->i', offset, second)
+    step = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+    return np.clip(t - step, 0, 1)
+
+
+def _distance_from_cubic(controls, data, t, sampling_error):
+    """Returns how far the cubic strays from the polyline through the data, which has parameters t on it.
+
+    Each of the cubic's samples is measured against the data segments around its parameter only,
+    which can only overstate its distance.
+    """
+    steps = _curve_steps(controls[None], sampling_error)[0]
+    curve_t = np.linspace(0, 1, steps + 1)
+    samples = _bernstein(curve_t) @ controls
+    segment_count = len(data) - 1
+    nearest = np.searchsorted(np.maximum.accumulate(t), curve_t)
+    window = np.clip(nearest[:, None] + np.arange(-FIT_WINDOW, FIT_WINDOW), 0, segment_count - 1)
+    starts = data[window]
+    direction = data[window + 1] - starts
+    relative = samples[:, None] - starts
+    length_squared = (direction * direction).sum(axis=2)
+    u = np.clip((relative * direction).sum(axis=2) / np.where(length_squared > 0, length_squared, 1), 0, 1)
+    offset = relative - u[:, :, None] * direction
+    return np.hypot(offset[..., 0], offset[..., 1]).min(axis=1).max()
+
+
+def _distance_to_chord(points):
+    """Returns the distance of each point to the segment from the first point to the last."""
+    return _distance_to_segment(points, *np.broadcast_to(points[[0, -1]][:, None], (2,) + points.shape))
+
+
+def _distance_to_segment(points, starts, ends):
+    """Returns the distance of each point to the segment from its start to its end."""
+    direction = ends - starts
+    length_squared = np.einsum('ij,ij->i', direction, direction)
+    t = np.einsum('ij,ij->i', points - starts, direction) / np.where(length_squared > 0, length_squared, 1)
+    nearest = starts + np.clip(t, 0, 1)[:, None] * direction
+    return np.hypot(*(points - nearest).T)
+
+
+def iter_svg_paths(element, matrix=None, apply_transform=False):
+    """Yields every <path> under element in document order, with the transform it is drawn with."""
+    if apply_transform and 'transform' in element.attrib:
+        transform = parse_svg_transform(element.attrib['transform'])
+        matrix = transform if matrix is None else compose_transforms(matrix, transform)
+    if element.tag == '{http://www.w3.org/2000/svg}path':
+        yield element, matrix
+    for child in element:
+        yield from iter_svg_paths(child, matrix, apply_transform)
+
+
+def outline_from_svg_file(svg_file_path, apply_transform=False):
+    """Parses every <path> of an SVG file once into a single outline.
+
+    The glyph pipelines leave apply_transform off: their headline and metrics values are
+    tuned for potrace's untransformed, y-up path coordinates.
+    """
+    root = ET.parse(svg_file_path).getroot()
+    outlines = []
+    for element, matrix in iter_svg_paths(root, apply_transform=apply_transform):
+        outline = GlyphOutline.from_path_data(element.attrib.get('d', ''))
+        if matrix is not None:
+            outline = outline.transform(matrix)
+        outlines.append(outline)
+    return GlyphOutline.concatenate(outlines)
@@ -0,0 +1,124 @@
+from collections import namedtuple
+from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph
+import argparse
+import json
+import sqlite3
+from build_cache import glyph_metrics
+
+StoredGlyph = namedtuple(
+    "StoredGlyph", ["glyph_name", "glyf", "advance_width", "lsb", "codepoints", "bounds", "contours", "points"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS glyphs (
+    script TEXT NOT NULL,
+    glyph_name TEXT NOT NULL,
+    glyf BLOB NOT NULL,
+    advance_width INTEGER NOT NULL,
+    lsb INTEGER NOT NULL,
+    codepoints TEXT NOT NULL,
+    x_min INTEGER,
+    y_min INTEGER,
+    x_max INTEGER,
+    y_max INTEGER,
+    contours INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (script, glyph_name)
+)
+"""
+COLUMNS = "glyph_name, glyf, advance_width, lsb, codepoints, x_min, y_min, x_max, y_max, contours, points"
+
+
+def glyph_bytes(glyph):
+    """Returns the compiled glyf bytes of a glyph, without expanding glyphs that are still bytes."""
+    if hasattr(glyph, "data"):
+        return glyph.data
+    return glyph.compile(None)
+
+
+class GlyphStore:
+    """SQLite repository of compiled TrueType glyphs with their metrics, keyed by (script, glyph_name).
+
+    Glyphs keep the position they were stored at, so a font built from the store has the
+    same glyph order as the font they came from.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+
+    def replace_script(self, script, glyphs):
+        """Replaces every glyph of script with (glyph, codepoints, glyph_name, advance_width, lsb) tuples."""
+        rows = {}
+        for glyph, codepoints, glyph_name, advance_width, lsb in glyphs:
+            glyph_data = glyph_bytes(glyph)
+            metrics = glyph_metrics(glyph_data)
+            bounds = metrics["bounds"] or [None] * 4
+            # a later glyph of the same name replaces the earlier one but keeps its position, like in the font
+            rows[glyph_name] = (script, glyph_name, glyph_data, advance_width, lsb, json.dumps(codepoints),
+                                *bounds, metrics["contours"], metrics["points"])
+        with self.connection:
+            self.connection.execute("DELETE FROM glyphs WHERE script = ?", (script,))
+            self.connection.executemany(
+                f"INSERT INTO glyphs (script, {COLUMNS}, position) VALUES ({', '.join('?' * 13)})",
+                (row + (position,) for position, row in enumerate(rows.values())))
+        return len(rows)
+
+    def get_glyphs(self, script, glyph_names=None):
+        """Returns the StoredGlyphs of script in stored order, only those in glyph_names if given."""
+        query = f"SELECT position, {COLUMNS} FROM glyphs WHERE script = ?"
+        if glyph_names is None:
+            rows = list(self.connection.execute(query, (script,)))
+        else:
+            glyph_names = list(glyph_names)
+            rows = []
+            # the primary key index finds each name; SQLite limits the number of bound parameters
+            for start in range(0, len(glyph_names), 500):
+                chunk = glyph_names[start:start + 500]
+                rows.extend(self.connection.execute(
+                    f"{query} AND glyph_name IN ({', '.join('?' * len(chunk))})", (script, *chunk)))
+        rows.sort(key=lambda row: row[0])
+        stored_glyphs = []
+        for _, glyph_name, glyf, advance_width, lsb, codepoints, x_min, y_min, x_max, y_max, contours, points in rows:
+            bounds = None if x_min is None else (x_min, y_min, x_max, y_max)
+            stored_glyphs.append(
+                StoredGlyph(glyph_name, glyf, advance_width, lsb, json.loads(codepoints), bounds, contours, points))
+        return stored_glyphs
+
+    def close(self):
+        self.connection.close()
+
+
+def build_font_from_store(store, script, base_font_path, new_font_path, glyph_names=None):
+    """Builds a font, or a subset of it, straight from the stored glyf bytes; no SVG is parsed."""
+    from pipeline_for_font_creation import assemble_font
+
+    glyphs = []
+    compiled_metrics = {}
+    for stored in store.get_glyphs(script, glyph_names):
+        glyphs.append((TTGlyph(stored.glyf), stored.codepoints, stored.glyph_name, stored.advance_width, stored.lsb))
+        compiled_metrics[stored.glyph_name] = {
+            "bounds": stored.bounds, "contours": stored.contours, "points": stored.points}
+    assemble_font(base_font_path, glyphs, new_font_path, compiled_metrics)
+    return len(glyphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a font, or a subset of one, from the glyph store.")
+    parser.add_argument("store", help="glyph store written by pipeline_for_font_creation.py --store")
+    parser.add_argument("output", help="path of the new TTF font")
+    parser.add_argument("--script", default="tibetan", help="script the glyphs were stored under")
+    parser.add_argument("--base-font", default="../../data/base_font/AdobeBlank.ttf",
+                        help="font the glyphs are added to")
+    parser.add_argument("--glyphs", help="comma separated glyph names to keep, e.g. uni0F40,uni0F41")
+    args = parser.parse_args()
+
+    store = GlyphStore(args.store)
+    glyph_names = args.glyphs.split(",") if args.glyphs else None
+    glyph_count = build_font_from_store(store, args.script, args.base_font, args.output, glyph_names)
+    store.close()
+    print(f"glyphs added: {glyph_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import io
+import subprocess
+import numpy as np
+from glyph_outline import outline_from_svg_file
+
+POTRACE_SCALE = 5.5
+# potrace writes SVG path coordinates in tenths of a pixel
+SVG_UNIT = 10
+
+
+def bitmap_to_pbm(bitmap):
+    """Encodes a boolean ink bitmap (True is ink) as binary PBM bytes."""
+    height, width = bitmap.shape
+    return b"P4\n%d %d\n" % (width, height) + np.packbits(bitmap, axis=1).tobytes()
+
+
+class PotraceSubprocessTracer:
+    """Runs the potrace command line, streaming the bitmap as PBM on stdin and reading the SVG from stdout."""
+
+    def __init__(self, potrace="potrace", scale=POTRACE_SCALE):
+        self.command = [potrace, "-", "-s", "--scale", str(scale), "-o", "-"]
+
+    def trace(self, bitmap):
+        return self.trace_pbm(bitmap_to_pbm(bitmap))
+
+    def trace_pbm(self, pbm):
+        result = subprocess.run(self.command, input=pbm, stdout=subprocess.PIPE, check=True)
+        return result.stdout.decode("utf-8")
+
+
+class PotraceBindingTracer:
+    """Traces in-process with potracer, the pure-Python port of potrace, and writes the same SVG layout as potrace -s.
+
+    potracer installs as the potrace module; its Bitmap takes True as background, and its points have x and y.
+    """
+
+    def __init__(self, scale=POTRACE_SCALE):
+        import potrace
+        self.potrace = potrace
+        self.scale = scale
+
+    def trace(self, bitmap):
+        height, width = bitmap.shape
+        path = self.potrace.Bitmap(~bitmap).trace()
+
+        def unit(point):
+            # bitmap rows go down, potrace's SVG coordinates go up from the bottom edge
+            return round(point.x * SVG_UNIT), round((height - point.y) * SVG_UNIT)
+
+        commands = []
+        current = (0, 0)
+        for index, curve in enumerate(path):
+            start = unit(curve.start_point)
+            move = "M" if index == 0 else "m"
+            dx, dy = (start[0] - current[0], start[1] - current[1]) if index else start
+            commands.append(f"{move}{dx} {dy}")
+            current = start
+            last_op = "m"
+            for segment in curve:
+                if segment.is_corner:
+                    for point in (unit(segment.c), unit(segment.end_point)):
+                        delta = f"{point[0] - current[0]} {point[1] - current[1]}"
+                        commands.append(("l" if last_op != "l" else " ") + delta)
+                        current = point
+                        last_op = "l"
+                else:
+                    points = [unit(segment.c1), unit(segment.c2), unit(segment.end_point)]
+                    deltas = " ".join(f"{x - current[0]} {y - current[1]}" for x, y in points)
+                    commands.append(("c" if last_op != "c" else " ") + deltas)
+                    current = points[-1]
+                    last_op = "c"
+            commands.append("z")
+
+        svg_width = width * self.scale
+        svg_height = height * self.scale
+        return (
+            '<?xml version="1.0" standalone="no"?>\n'
+            '<svg version="1.0" xmlns="http://www.w3.org/2000/svg"\n'
+            f' width="{svg_width:f}pt" height="{svg_height:f}pt" viewBox="0 0 {svg_width:f} {svg_height:f}"\n'
+            ' preserveAspectRatio="xMidYMid meet">\n'
+            f'<g transform="translate(0.000000,{svg_height:f}) '
+            f'scale({self.scale / SVG_UNIT:f},{-self.scale / SVG_UNIT:f})"\n'
+            'fill="#000000" stroke="none">\n'
+            f'<path d="{"".join(commands)}"/>\n'
+            '</g>\n'
+            '</svg>\n'
+        )
+
+
+TRACERS = {
+    "potrace": PotraceSubprocessTracer,
+    "potracer": PotraceBindingTracer,
+}
+
+
+def get_tracer(name="potrace", **options):
+    """Returns a tracer backend by name; every backend has trace(bitmap) -> SVG text."""
+    if name not in TRACERS:
+        raise ValueError(f"unknown tracer '{name}', expected one of: {', '.join(TRACERS)}")
+    return TRACERS[name](**options)
+
+
+def trace_stored_bitmap(tracer, store, name):
+    """Traces a bitmap of a BitmapStore; the potrace command gets its stored PBM rows without unpacking them."""
+    if hasattr(tracer, "trace_pbm"):
+        return tracer.trace_pbm(store.pbm(name))
+    return tracer.trace(store.bitmap(name))
+
+
+def trace_outline(tracer, bitmap):
+    """Traces a bitmap straight to a GlyphOutline, without writing any file."""
+    return outline_from_svg_file(io.StringIO(tracer.trace(bitmap)))
@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from fontTools.otlLib.builder import buildLigatureSubstSubtable, buildLookup
+from fontTools.ttLib import newTable
+from fontTools.ttLib.tables import otTables
+from fontTools.ttLib.tables.DefaultTable import DefaultTable
+from cmap_layout import build_character_map
+
+# ccmp is applied by every HarfBuzz shaper before the script-specific features
+FEATURE_TAG = "ccmp"
+SCRIPT_TAGS = ["DFLT", "tibt"]
+# bump when build_gsub changes the tables it writes
+GSUB_VERSION = 1
+
+
+def ligature_rules(glyphs):
+    """Maps the component glyph names of every stack to the name of the stack glyph.
+
+    glyphs are (glyph, codepoints, glyph_name, ...) tuples. A stack can be reached when every one
+    of its codepoints has a single-codepoint glyph in the cmap; returns (ligatures, names of the
+    stacks that can't).
+    """
+    character_map = build_character_map(glyphs)
+    ligatures = {}
+    unreachable = []
+    for glyph in glyphs:
+        codepoints, glyph_name = glyph[1], glyph[2]
+        if len(codepoints) < 2:
+            continue
+        components = tuple(character_map.get(codepoint) for codepoint in codepoints)
+        if None in components:
+            unreachable.append(glyph_name)
+        else:
+            ligatures[components] = glyph_name
+    return ligatures, unreachable
+
+
+def build_gsub(ligatures):
+    """Returns a GSUB table object with one ligature lookup, under FEATURE_TAG for every script in SCRIPT_TAGS."""
+    gsub = otTables.GSUB()
+    gsub.Version = 0x00010000
+
+    # buildLigatureSubstSubtable puts longer ligatures first, so a stack wins over the stacks it starts with
+    gsub.LookupList = otTables.LookupList()
+    gsub.LookupList.Lookup = [buildLookup([buildLigatureSubstSubtable(ligatures)])]
+    gsub.LookupList.LookupCount = 1
+
+    feature = otTables.Feature()
+    feature.FeatureParams = None
+    feature.LookupListIndex = [0]
+    feature.LookupCount = 1
+    feature_record = otTables.FeatureRecord()
+    feature_record.FeatureTag = FEATURE_TAG
+    feature_record.Feature = feature
+    gsub.FeatureList = otTables.FeatureList()
+    gsub.FeatureList.FeatureRecord = [feature_record]
+    gsub.FeatureList.FeatureCount = 1
+
+    gsub.ScriptList = otTables.ScriptList()
+    gsub.ScriptList.ScriptRecord = []
+    for script_tag in sorted(SCRIPT_TAGS):
+        lang_sys = otTables.DefaultLangSys()
+        lang_sys.LookupOrder = None
+        lang_sys.ReqFeatureIndex = 0xFFFF
+        lang_sys.FeatureIndex = [0]
+        lang_sys.FeatureCount = 1
+        script = otTables.Script()
+        script.DefaultLangSys = lang_sys
+        script.LangSysRecord = []
+        script.LangSysCount = 0
+        script_record = otTables.ScriptRecord()
+        script_record.ScriptTag = script_tag
+        script_record.Script = script
+        gsub.ScriptList.ScriptRecord.append(script_record)
+    gsub.ScriptList.ScriptCount = len(gsub.ScriptList.ScriptRecord)
+    return gsub
+
+
+def compile_gsub(font, ligatures):
+    """Returns the compiled GSUB bytes of the ligatures for the glyph order of font."""
+    gsub_table = newTable('GSUB')
+    gsub_table.table = build_gsub(ligatures)
+    return gsub_table.compile(font)
+
+
+def gsub_key(font, ligatures):
+    """Returns the SHA-1 of the ligature rules with their glyph IDs, which is all the compiled GSUB depends on."""
+    glyph_ids = {glyph_name: glyph_id for glyph_id, glyph_name in enumerate(font.getGlyphOrder())}
+    rules = sorted([[glyph_ids[name] for name in components], glyph_ids[ligature], list(components), ligature]
+                   for components, ligature in ligatures.items())
+    content = {"version": GSUB_VERSION, "feature": FEATURE_TAG, "scripts": sorted(SCRIPT_TAGS), "rules": rules}
+    return hashlib.sha1(json.dumps(content).encode('utf-8')).hexdigest()
+
+
+class GsubCache:
+    """The compiled GSUB of the last build, keyed by gsub_key; a build with other rules or glyph IDs recompiles."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entry = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                try:
+                    self.entry = json.load(f)
+                except ValueError:
+                    self.entry = {}
+
+    def get(self, key):
+        """Returns the compiled GSUB bytes for key, or None."""
+        if self.entry.get("key") != key:
+            return None
+        return base64.b64decode(self.entry["gsub"])
+
+    def put(self, key, gsub_data):
+        """Replaces the cached GSUB and writes it atomically."""
+        self.entry = {"key": key, "gsub": base64.b64encode(gsub_data).decode('ascii')}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".json", dir=os.path.dirname(self.path) or ".")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.entry, f)
+        os.replace(temp_path, self.path)
+
+
+def compiled_gsub_table(font, ligatures, cache=None):
+    """Returns a GSUB table holding the compiled bytes, which font.save() writes as they are.
+
+    The glyph order of font must be final. With a cache, unchanged rules reuse the bytes of the last build.
+    """
+    key = gsub_key(font, ligatures)
+    gsub_data = cache.get(key) if cache is not None else None
+    if gsub_data is None:
+        gsub_data = compile_gsub(font, ligatures)
+        if cache is not None:
+            cache.put(key, gsub_data)
+    gsub_table = DefaultTable('GSUB')
+    gsub_table.data = gsub_data
+    return gsub_table
+
+
+def add_gsub(font, glyphs, cache=None):
+    """Adds the ligature substitutions that reach the stacks in glyphs to font; fonts without stacks get no GSUB."""
+    start = time.perf_counter()
+    ligatures, unreachable = ligature_rules(glyphs)
+    if unreachable:
+        print(f"stacks without a glyph for each codepoint, left out of GSUB: {len(unreachable)}")
+    if not ligatures:
+        return
+    font['GSUB'] = compiled_gsub_table(font, ligatures, cache)
+    print(f"GSUB: {len(ligatures)} ligatures, {len(font['GSUB'].data)} bytes in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from image_storage import ImageObject
+
+
+class ImageCache:
+    """Persistent on-disk cache of annotation images, keyed by S3 object key.
+
+    Files are named after the SHA-1 of the key and ETag, so samples of the same stack never
+    overwrite each other. The index is an append-only JSONL log replayed into an ordered
+    dict on start, which gives O(1) lookups and the least recently used order for eviction
+    once the cached files grow past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=20 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.jsonl")
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+        self.index_file = open(self.index_path, 'a', encoding='utf-8')
+        if self.index_file.tell() and not self._index_ends_with_newline():
+            # end the line a crash left half written, so the next record starts a line of its own
+            self.index_file.write("\n")
+
+    def _index_ends_with_newline(self):
+        with open(self.index_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load_index(self):
+        log_lines = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                for log_line in f:
+                    log_lines += 1
+                    try:
+                        record = json.loads(log_line)
+                    except ValueError:
+                        # a crash can leave the last line half written
+                        continue
+                    key = record["key"]
+                    if record["op"] == "put":
+                        self.entries[key] = {"etag": record["etag"], "size": record["size"], "file": record["file"]}
+                    elif record["op"] == "use" and key in self.entries:
+                        self.entries.move_to_end(key)
+                    elif record["op"] == "evict":
+                        self.entries.pop(key, None)
+        for key, entry in list(self.entries.items()):
+            if not os.path.exists(os.path.join(self.cache_dir, entry["file"])):
+                del self.entries[key]
+        self.total_bytes = sum(entry["size"] for entry in self.entries.values())
+        if log_lines > 2 * len(self.entries) + 1000:
+            self._compact_index()
+
+    def _compact_index(self):
+        fd, temp_path = tempfile.mkstemp(suffix=".jsonl", dir=self.cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for key, entry in self.entries.items():
+                f.write(json.dumps({"op": "put", "key": key, **entry}, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.index_path)
+
+    def _log(self, record):
+        self.index_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.index_file.flush()
+
+    def get(self, key):
+        """Returns the cached ImageObject for key, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            self._log({"op": "use", "key": key})
+        try:
+            with open(os.path.join(self.cache_dir, entry["file"]), 'rb') as f:
+                return ImageObject(key, f.read(), entry["etag"])
+        except FileNotFoundError:
+            return None
+
+    def put(self, image):
+        """Writes the image atomically and records it in the index."""
+        file_name = hashlib.sha1(f"{image.key}\0{image.etag}".encode('utf-8')).hexdigest()
+        file_name += os.path.splitext(image.key)[1]
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image.data)
+        os.replace(temp_path, os.path.join(self.cache_dir, file_name))
+
+        with self.lock:
+            old_entry = self.entries.pop(image.key, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry["size"]
+                if old_entry["file"] != file_name:
+                    self._remove_file(old_entry["file"])
+            entry = {"etag": image.etag, "size": len(image.data), "file": file_name}
+            self.entries[image.key] = entry
+            self.total_bytes += entry["size"]
+            self._log({"op": "put", "key": image.key, **entry})
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            self._log({"op": "evict", "key": key})
+            self._remove_file(entry["file"])
+
+    def _remove_file(self, file_name):
+        try:
+            os.remove(os.path.join(self.cache_dir, file_name))
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        self.index_file.close()
+
+
+class CachedImageStore:
+    """Serves images from an ImageCache and only asks the wrapped store for keys it does not have.
+
+    Annotation images are never rewritten under the same key, so a cached key is trusted without
+    asking S3 for its ETag; warm reruns do no network I/O at all.
+    """
+
+    def __init__(self, store, cache):
+        self.store = store
+        self.cache = cache
+
+    def get(self, key):
+        image = self.cache.get(key)
+        if image is None:
+            image = self.store.get(key)
+            self.cache.put(image)
+        return image
+
+    def close(self):
+        self.cache.close()
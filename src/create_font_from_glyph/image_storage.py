@@ -0,0 +1,67 @@
+from collections import namedtuple
+import os
+import random
+import time
+import urllib.parse
+
+ImageObject = namedtuple("ImageObject", ["key", "data", "etag"])
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "SlowDown",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "503",
+}
+
+
+def image_key_from_url(image_url):
+    """Returns the decoded S3 object key of an annotation image URL."""
+    image_parts = (image_url.split("?")[0]).split("/")
+    return urllib.parse.unquote("/".join(image_parts[4:]))
+
+
+def is_throttling_error(error):
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLING_ERROR_CODES
+
+
+class S3ImageStore:
+    """Reads images from an S3 bucket, retrying throttled requests with exponential backoff.
+
+    The boto3 client is shared by every fetch thread, so they all use its connection pool.
+    """
+
+    def __init__(self, client, bucket, max_retries=5, backoff=0.5):
+        self.client = client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def get(self, key):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.get_object(Bucket=self.bucket, Key=key)
+                return ImageObject(key, response['Body'].read(), response.get('ETag', '').strip('"'))
+            except Exception as e:
+                if attempt == self.max_retries or not is_throttling_error(e):
+                    raise
+                time.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+
+class LocalImageStore:
+    """Reads images from a local directory laid out like the bucket, for tests and offline benchmarks."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, key):
+        path = os.path.join(self.root, key)
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(path)
+        return ImageObject(key, data, f"{stat.st_size}-{stat.st_mtime_ns}")
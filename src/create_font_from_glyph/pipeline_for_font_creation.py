@@ -1,14 +1,27 @@
 from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph
-from fontTools.pens.basePen import BasePen
-from xml.etree import ElementTree as ET
-from svg.path import parse_path
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from functools import partial
+from multiprocessing import Pool
+import argparse
 import os
-from fontTools.ttLib import TTFont
-from fontTools.pens.ttGlyphPen import TTGlyphPen
-from fontTools.pens.transformPen import TransformPen
+import time
 from fontTools.ttLib import TTFont, newTable
-from fontTools.ttLib.tables._c_m_a_p import cmap_format_4
-from convert_px_to_fontunit import create_font_units
+from base_font import base_font_template
+from convert_px_to_fontunit import record_font_units
+from glyph_manifest import generate_glyph_name, load_glyph_records
+from glyph_outline import outline_from_svg_file
+from build_cache import GlyphBuildCache, glyph_metrics
+from glyf_assembly import recalc_font_metrics
+from glyph_store import GlyphStore
+from cmap_layout import build_character_map, build_cmap_table, cmap_layout_stats, order_glyphs, unique_glyph_order
+from gsub_builder import GsubCache, add_gsub
+
+DESIRED_HEADLINE = -2000
+HEADLINE_OFFSET = 2700
+# everything besides the SVG content that changes the compiled glyphs; bump version when the compiling code changes
+BUILD_PARAMS = {"desired_headline": DESIRED_HEADLINE, "headline_offset": HEADLINE_OFFSET, "version": 1}
 
 
 def extract_codepoints(filename):
@@ -16,183 +29,299 @@ def extract_codepoints(filename):
     codepoints = [ord(char) for char in tibetan_char]
     return codepoints
 
-def generate_glyph_name(codepoints):
-    glyph_name = 'uni' + ''.join(f"{codepoint:04X}" for codepoint in codepoints)
-    return glyph_name
-
-class SVGPen(BasePen):
-    def __init__(self, glyphSet=None):
-        super().__init__(glyphSet)
-        self.currentPoint = (0, 0)
-        self.path = []
-
-    def _moveTo(self, pt):
-        if self.path and self.path[-1][0] != 'closePath':
-            self.closePath()
-        self.currentPoint = pt
-        self.path.append(('moveTo', pt))
-
-    def _lineTo(self, pt):
-        self.currentPoint = pt
-        self.path.append(('lineTo', pt))
-
-    def _curveToOne(self, pt1, pt2, pt3):
-        self.currentPoint = pt3
-        self.path.append(('curveTo', (pt1, pt2, pt3)))
-
-    def get_path(self):
-        if self.path and self.path[-1][0] != 'closePath':
-            self.closePath()
-        return self.path
-
-    def reset(self):
-        self.currentPoint = (0, 0)
-        self.path = []
-
-    def closePath(self):
-        self.path.append(('closePath',))
-
-    def pathFromSVGPathData(self, path_data):
-        path = parse_path(path_data)
-        for segment in path:
-            if segment.__class__.__name__ == 'Line':
-                self._lineTo((segment.end.real, segment.end.imag))
-            elif segment.__class__.__name__ == 'CubicBezier':
-                self._curveToOne((segment.control1.real, segment.control1.imag),
-                                 (segment.control2.real, segment.control2.imag),
-                                 (segment.end.real, segment.end.imag))
-            elif segment.__class__.__name__ == 'Move':
-                self._moveTo((segment.end.real, segment.end.imag))
-        if self.path and self.path[-1][0] != 'closePath':
-            self.closePath()    
-
-    def get_bbox(self):
-        if not self.path:
-            return None
-        x_coords = []
-        y_coords = []
-        for pt in self.path:
-            if pt[0] in ['moveTo', 'lineTo']:
-                x_coords.append(pt[1][0])
-                y_coords.append(pt[1][1])
-            elif pt[0] == 'curveTo':
-                for point in pt[1]:
-                    x_coords.append(point[0])
-                    y_coords.append(point[1])
-        return min(x_coords), min(y_coords), max(x_coords), max(y_coords)
-
-
-def parse_svg_to_glyph(svg_file_path):
+def parse_svg_to_outline(svg_file_path, tolerance=None):
+    """Returns (outline, codepoints, glyph_name), simplified within tolerance font units if given."""
     filename = os.path.splitext(os.path.basename(svg_file_path))[0]
     codepoints = extract_codepoints(filename)
     glyph_name = generate_glyph_name(codepoints)
-    desired_headline = -2000
 
-    tree = ET.parse(svg_file_path)
-    root = tree.getroot()
+    outline = outline_from_svg_file(svg_file_path)
+    bbox = outline.bounds()
+    if bbox:
+        vertical_translation = DESIRED_HEADLINE - bbox[3]
+        outline = outline.translate(0, vertical_translation + HEADLINE_OFFSET)
 
-    glyph = TTGlyph()
-    glyph.unicodes = codepoints or []
+    print(f"File Name: {filename}")
+    print(f"Glyph Name: {glyph_name}")
+    print(f"Unicodes: {codepoints}")
+    if tolerance is not None:
+        point_count = len(outline)
+        outline = outline.simplify(tolerance)
+        print(f"Points: {point_count} -> {len(outline)}, saved {point_count - len(outline)}")
 
-    pen = SVGPen(None)
-    ttPen = TTGlyphPen()
+    return outline, codepoints, glyph_name
 
-    min_x, min_y, max_x, max_y = float('inf'), float('inf'), float('-inf'), float('-inf')
 
-    for element in root.iter('{http://www.w3.org/2000/svg}path'):
-        path_data = element.attrib.get('d', '')
-        pen.pathFromSVGPathData(path_data)
-        bbox = pen.get_bbox()
-        pen.reset()
+def parse_svg_to_glyph(svg_file_path, max_err=None, tolerance=None):
+    """Returns (glyph, codepoints, glyph_name); with max_err the cubic curves are converted to quadratic ones."""
+    outline, codepoints, glyph_name = parse_svg_to_outline(svg_file_path, tolerance)
+    glyph = outline.to_glyph() if max_err is None else outline.to_quadratic_glyph(max_err)
+    return glyph, codepoints, glyph_name
 
-        if bbox:
-            min_x = min(min_x, bbox[0])
-            min_y = min(min_y, bbox[1])
-            max_x = max(max_x, bbox[2])
-            max_y = max(max_y, bbox[3])
 
-    vertical_translation = desired_headline - max_y
+def compile_svg_to_glyph(svg_file_path, max_err=None, tolerance=None):
+    """Parses an SVG file and returns the compiled glyf bytes instead of a live glyph object."""
+    glyph, codepoints, glyph_name = parse_svg_to_glyph(svg_file_path, max_err, tolerance)
+    return glyph.compile(None), codepoints, glyph_name
 
-    for element in root.iter('{http://www.w3.org/2000/svg}path'):
-        path_data = element.attrib.get('d', '')
-        pen.pathFromSVGPathData(path_data)
 
-        transformPen = TransformPen(ttPen, (1.0, 0, 0, 1.0, 0, vertical_translation + 2700))
+def compile_svg_to_charstring(svg_job, tolerance=None):
+    """Parses an (svg_file_path, advance_width) job and returns a CFF charstring with the cubics kept."""
+    svg_file_path, advance_width = svg_job
+    outline, codepoints, glyph_name = parse_svg_to_outline(svg_file_path, tolerance)
+    return outline.to_charstring(advance_width), codepoints, glyph_name
 
-        for command in pen.get_path():
-            if command[0] == 'moveTo':
-                transformPen.moveTo(command[1])
-            elif command[0] == 'lineTo':
-                transformPen.lineTo(command[1])
-            elif command[0] == 'curveTo':
-                transformPen.curveTo(*command[1])
-            elif command[0] == 'closePath':
-                transformPen.closePath()
 
-        pen.reset()
+def iter_compiled(compile_job, jobs, workers=1, chunksize=16):
+    """Yields compile_job(job) for the jobs in order, in a pool of worker processes when workers > 1."""
+    if workers <= 1:
+        yield from map(compile_job, jobs)
+        return
+    with Pool(workers) as pool:
+        # imap keeps the input order, so the font is identical to a serial build
+        yield from pool.imap(compile_job, jobs, chunksize)
 
-    glyph = ttPen.glyph()
 
-    print(f"File Name: {filename}")
-    print(f"Glyph Name: {glyph_name}")
-    print(f"Unicodes: {codepoints}")
+def iter_compiled_glyphs(svg_files, workers=1, chunksize=16, max_err=None, tolerance=None):
+    """Yields (glyph_data, codepoints, glyph_name) for the SVG files in order.
 
-    return glyph, codepoints, glyph_name
+    Each glyph is compiled as soon as it is parsed.
+    """
+    compile_job = partial(compile_svg_to_glyph, max_err=max_err, tolerance=tolerance)
+    yield from iter_compiled(compile_job, svg_files, workers, chunksize)
 
 
-def add_glyphs_to_font(font_path, glyphs_data, new_font_path):
-    font = TTFont(font_path)
-    
-    for table_name in ['cmap', 'head', 'hhea', 'maxp', 'post', 'OS/2', 'name', 'glyf', 'hmtx']:
-        if table_name not in font:
-            font[table_name] = newTable(table_name)
+def compile_glyphs(svg_files, workers=1, chunksize=16, streaming=False, max_err=None, tolerance=None):
+    """Compiles SVG files to glyphs, in the order of svg_files, using a pool of worker processes.
 
-    font['cmap'].tableVersion = 0
-    font['cmap'].tables = []
-    cmap_subtable = cmap_format_4(4)
-    cmap_subtable.platformID = 3
-    cmap_subtable.platEncID = 1
-    cmap_subtable.language = 0
-    cmap_subtable.cmap = {}
-    all_glyph_units = create_font_units("../../data/derge_font/svg")
+    With streaming, or with workers, only the compiled glyf bytes of each glyph are kept.
+    max_err converts the cubic curves to quadratic ones within that many font units, tolerance
+    simplifies the outlines first.
+    """
+    if workers <= 1 and not streaming:
+        return [parse_svg_to_glyph(svg_file, max_err, tolerance) for svg_file in svg_files]
+    compiled = iter_compiled_glyphs(svg_files, workers, chunksize, max_err, tolerance)
+    return [(TTGlyph(glyph_data), codepoints, glyph_name) for glyph_data, codepoints, glyph_name in compiled]
 
-    for (glyph, codepoints, glyph_name), (glyph_width, lsb, rsb) in zip(glyphs_data, all_glyph_units):
-        if 'glyf' in font:
-            font['glyf'][glyph_name] = glyph
 
-        advance_width = glyph_width + lsb + rsb
+def compile_glyphs_incremental(svg_files, cache, workers=1, chunksize=16, max_err=None, tolerance=None):
+    """Like compile_glyphs, but only compiles the SVG files the build cache has no glyph for.
 
-        if 'hmtx' in font:
-            font['hmtx'][glyph_name] = (advance_width, lsb)
+    max_err and tolerance must be part of the cache's build parameters.
+    """
+    keys = [cache.key(svg_file) for svg_file in svg_files]
+    changed = {}
+    for svg_file, key in zip(svg_files, keys):
+        if cache.get(key) is None:
+            changed.setdefault(key, svg_file)
 
-        if len(glyph_name.split('0F')) <= 2:
-            for cp in codepoints:
-                cmap_subtable.cmap[cp] = glyph_name  
+    compiled = iter_compiled_glyphs(list(changed.values()), workers, chunksize, max_err, tolerance)
+    # compiled goes first so the generator runs to its end and closes its pool
+    for (glyph_data, _, _), key in zip(compiled, changed):
+        cache.put(key, glyph_data)
+    pruned = cache.save(keys)
+    print(f"glyphs compiled: {len(changed)}, reused: {len(set(keys)) - len(changed)}, pruned: {pruned}")
 
-    font['cmap'].tables.append(cmap_subtable)
-    font['cmap'].tables.sort(key=lambda x: (x.platformID, x.platEncID, x.language, x.format))
+    glyphs_data = []
+    for svg_file, key in zip(svg_files, keys):
+        codepoints = extract_codepoints(os.path.splitext(os.path.basename(svg_file))[0])
+        glyphs_data.append((TTGlyph(cache.get(key)), codepoints, generate_glyph_name(codepoints)))
+    return glyphs_data
+
+
+def with_advance_widths(glyphs_data, glyph_units):
+    """Returns (glyph, codepoints, glyph_name, advance_width, lsb) tuples.
+
+    glyph_units maps glyph names to (glyph_width, lsb, rsb).
+    """
+    glyphs = []
+    for glyph, codepoints, glyph_name in glyphs_data:
+        glyph_width, lsb, rsb = glyph_units[glyph_name]
+        glyphs.append((glyph, codepoints, glyph_name, glyph_width + lsb + rsb, lsb))
+    return glyphs
+
+
+def add_glyphs_to_font(font_path, glyphs_data, new_font_path, glyph_units):
+    """Adds the glyphs to the font; glyph_units maps each glyph name to its (glyph_width, lsb, rsb)."""
+    assemble_font(font_path, with_advance_widths(glyphs_data, glyph_units), new_font_path)
+
+
+def compiled_glyph_metrics(glyphs):
+    """Returns the metrics of every glyph by name when all glyphs are still compiled bytes, otherwise None."""
+    metrics = {}
+    for glyph, _, glyph_name, _, _ in glyphs:
+        if hasattr(glyph, "data"):
+            glyph_data = glyph.data
+        elif glyph.numberOfContours == 0 and not hasattr(glyph, "program"):
+            # TTGlyph(b"") of an empty SVG keeps no data
+            glyph_data = b""
+        else:
+            return None
+        metrics[glyph_name] = glyph_metrics(glyph_data)
+    return metrics
 
-    font.save(new_font_path)
 
+def assemble_font(font_path, glyphs, new_font_path, compiled_metrics=None, gsub_cache=None):
+    """Adds (glyph, codepoints, glyph_name, advance_width, lsb) glyphs to the font at font_path and saves it.
 
+    The base font is read once per process, see base_font_template; font_path None starts from
+    the minimal skeleton font.
 
+    With compiled_metrics, the metrics of the glyphs' compiled bytes by glyph name, the glyf table
+    is written straight from those bytes; no glyph is expanded to recalculate bounding boxes.
+    The stacks get a GSUB ligature lookup, reused from gsub_cache when it is unchanged.
+    """
+    template = base_font_template(font_path)
+    font = template.new_font(recalc_bboxes=compiled_metrics is None)
 
-def main():
+    for table_name in ['cmap', 'head', 'hhea', 'maxp', 'post', 'OS/2', 'name', 'glyf', 'hmtx']:
+        if table_name not in font:
+            font[table_name] = newTable(table_name)
+
+    font['cmap'] = build_cmap_table(build_character_map(glyphs))
+
+    for glyph, codepoints, glyph_name, advance_width, lsb in glyphs:
+        if 'glyf' in font:
+            font['glyf'][glyph_name] = glyph
+
+        if 'hmtx' in font:
+            font['hmtx'][glyph_name] = (advance_width, lsb)
+
+    add_gsub(font, glyphs, gsub_cache)
+    if compiled_metrics is not None:
+        recalc_font_metrics(font, {**template.glyph_metrics(), **compiled_metrics})
+    template.save_font(font, new_font_path)
+
+
+
+def assemble_otf(font_path, glyphs, new_font_path, family_name="Derge"):
+    """Builds an OpenType CFF font from (charstring, codepoints, glyph_name, advance_width, lsb) glyphs.
+
+    The units per em and vertical metrics are taken from the font at font_path.
+    """
+    base_font = base_font_template(font_path).font
+    notdef_width = base_font['hmtx']['.notdef'][0]
+    char_strings = {".notdef": T2CharStringPen(notdef_width, None).getCharString()}
+    metrics = {".notdef": (notdef_width, 0)}
+    for char_string, codepoints, glyph_name, advance_width, lsb in glyphs:
+        char_strings[glyph_name] = char_string
+        metrics[glyph_name] = (advance_width, lsb)
+
+    font_builder = FontBuilder(base_font['head'].unitsPerEm, isTTF=False)
+    font_builder.setupGlyphOrder(list(char_strings))
+    font_builder.setupCharacterMap(build_character_map(glyphs))
+    font_builder.setupCFF(family_name, {"FullName": family_name}, char_strings, {})
+    font_builder.setupHorizontalMetrics(metrics)
+    font_builder.setupHorizontalHeader(ascent=base_font['hhea'].ascent, descent=base_font['hhea'].descent)
+    font_builder.setupNameTable({"familyName": family_name, "styleName": "Regular"})
+    base_os2 = base_font['OS/2']
+    font_builder.setupOS2(sTypoAscender=base_os2.sTypoAscender, sTypoDescender=base_os2.sTypoDescender,
+                          usWinAscent=base_os2.usWinAscent, usWinDescent=base_os2.usWinDescent)
+    font_builder.setupPost()
+    add_gsub(font_builder.font, glyphs)
+    font_builder.save(new_font_path)
+
+
+def count_outline_points(font_path):
+    """Returns the number of outline points, off-curve points included, in a TTF or OTF font."""
+    font = TTFont(font_path)
+    if 'glyf' in font:
+        glyf_table = font['glyf']
+        return sum(len(glyf_table[glyph_name].getCoordinates(glyf_table)[0]) for glyph_name in font.getGlyphOrder())
+    glyph_set = font.getGlyphSet()
+    points = 0
+    for glyph_name in font.getGlyphOrder():
+        pen = RecordingPen()
+        glyph_set[glyph_name].draw(pen)
+        points += sum(len(args) for _, args in pen.value)
+    return points
+
+
+def report_cmap_layout(base_font_path, glyphs_before, glyphs_after):
+    base_glyph_order = base_font_template(base_font_path).glyph_order()
+    for label, glyphs in (("before", glyphs_before), ("after", glyphs_after)):
+        glyph_order = unique_glyph_order(base_glyph_order, glyphs)
+        size, segments, groups = cmap_layout_stats(glyph_order, build_character_map(glyphs))
+        print(f"cmap {label} layout: {size} bytes, {segments} format 4 segments, {groups} format 12 groups")
+
+
+def report_build(font_path, glyph_count, seconds):
+    print(f"{os.path.basename(font_path)}: {glyph_count} glyphs, {count_outline_points(font_path)} points, "
+          f"{os.path.getsize(font_path) / 1024:.0f} KB, built in {seconds:.2f}s")
+
+
+def main(workers=1, chunksize=16, incremental=False, store_path=None, script="tibetan", streaming=False,
+         max_err=None, cff=False, tolerance=None, keep_order=False):
+    start = time.perf_counter()
     directory = "../../data/derge_font/svg" 
     blank_font_path = "../../data/base_font/AdobeBlank.ttf"  
     new_font_path = "../../data/derge_font/ttf/derge.ttf"  
-    glyphs_data = []
-    for filename in os.listdir(directory):
-        if filename.endswith(".svg"):
-            svg_file = os.path.join(directory, filename)
-            glyph, codepoints, glyph_name = parse_svg_to_glyph(svg_file)
-            glyphs_data.append((glyph, codepoints, glyph_name))
+    build_cache_path = "../../data/derge_font/build_cache.json"
+    gsub_cache_path = "../../data/derge_font/gsub_cache.json"
+    glyph_records = load_glyph_records(directory)
+    svg_files = [os.path.join(directory, record["svg"]) for record in glyph_records]
+    glyph_units = {record["glyph_name"]: record_font_units(record) for record in glyph_records}
+
+    if cff:
+        new_font_path = os.path.splitext(new_font_path)[0] + ".otf"
+        jobs = [(svg_file, sum(glyph_units[record["glyph_name"]]))
+                for svg_file, record in zip(svg_files, glyph_records)]
+        compile_job = partial(compile_svg_to_charstring, tolerance=tolerance)
+        glyphs = with_advance_widths(iter_compiled(compile_job, jobs, workers, chunksize), glyph_units)
+        if not keep_order:
+            glyphs = order_glyphs(glyphs)
+        print(f"glyphs added: {len(glyphs)}")
+        assemble_otf(blank_font_path, glyphs, new_font_path)
+        report_build(new_font_path, len(glyphs), time.perf_counter() - start)
+        return
+
+    if incremental:
+        build_params = dict(BUILD_PARAMS)
+        if max_err is not None:
+            build_params["max_err"] = max_err
+        if tolerance is not None:
+            build_params["simplify_tolerance"] = tolerance
+        glyphs_data = compile_glyphs_incremental(
+            svg_files, GlyphBuildCache(build_cache_path, build_params), workers, chunksize, max_err, tolerance)
+    else:
+        glyphs_data = compile_glyphs(svg_files, workers, chunksize, streaming, max_err, tolerance)
     
     print(f"glyphs added: {len(glyphs_data)}")
-    add_glyphs_to_font(blank_font_path, glyphs_data, new_font_path)
+    glyphs = with_advance_widths(glyphs_data, glyph_units)
+    if not keep_order:
+        ordered_glyphs = order_glyphs(glyphs)
+        report_cmap_layout(blank_font_path, glyphs, ordered_glyphs)
+        glyphs = ordered_glyphs
+    if store_path is not None:
+        store = GlyphStore(store_path)
+        print(f"glyphs stored: {store.replace_script(script, glyphs)}")
+        store.close()
+    gsub_cache = GsubCache(gsub_cache_path) if incremental else None
+    assemble_font(blank_font_path, glyphs, new_font_path, compiled_glyph_metrics(glyphs), gsub_cache)
+    report_build(new_font_path, len(glyphs), time.perf_counter() - start)
 
 if __name__ == "__main__":
-    main()
-
- 
-
+    parser = argparse.ArgumentParser(description="Create a TTF font from the derge SVG glyphs.")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes used to compile glyphs")
+    parser.add_argument("--chunksize", type=int, default=16, help="number of SVG files sent to a worker at a time")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the glyphs of unchanged SVG files and an unchanged GSUB from the build caches")
+    parser.add_argument("--store", help="also save the compiled glyphs to this glyph store (SQLite)")
+    parser.add_argument("--script", default="tibetan", help="script the glyphs are stored under")
+    parser.add_argument("--streaming", action="store_true",
+                        help="keep only the compiled bytes of each glyph and write glyf from them")
+    outline_format = parser.add_mutually_exclusive_group()
+    outline_format.add_argument("--max-err", type=float,
+                                help="convert the cubic curves to quadratic ones with cu2qu, "
+                                     "within this many font units")
+    outline_format.add_argument("--cff", action="store_true",
+                                help="write an OpenType CFF font (.otf) that keeps the cubic curves")
+    parser.add_argument("--simplify", type=float, metavar="TOLERANCE",
+                        help="redraw the outlines with fewer lines and curves, within this many font units")
+    parser.add_argument("--keep-order", action="store_true",
+                        help="keep the glyphs in SVG order instead of ordering them by codepoint and stack")
+    args = parser.parse_args()
+    if args.cff and (args.incremental or args.store):
+        parser.error("--cff can't be combined with --incremental or --store, which hold glyf glyphs")
+    main(args.workers, args.chunksize, args.incremental, args.store, args.script, args.streaming,
+         args.max_err, args.cff, args.simplify, args.keep_order)
@@ -1,71 +1,83 @@
+from collections import Counter
 from pathlib import Path
-from config import MONLAM_AI_OCR_BUCKET, monlam_ai_ocr_s3_client
-from PIL import Image, ImageDraw
-import urllib.parse
+from glyph_image_cleaning import clean_glyph_image
+from glyph_tracing import get_tracer, trace_stored_bitmap
+from image_storage import LocalImageStore, S3ImageStore, image_key_from_url
+from image_cache import CachedImageStore, ImageCache
+from staged_pipeline import Stage, run_pipeline
+from progress_journal import ProgressJournal
+from glyph_manifest import GlyphManifestWriter, glyph_record, manifest_path
+from sample_selection import SampleSelector
+from annotation_index import AnnotationIndex, stack_from_image_key
+from bitmap_store import BitmapStore
+from shards import in_shard, merge_shards, parse_shard, shard_path
+from PIL import Image
+import argparse
+import hashlib
+import io
 import os
+import tempfile
 import numpy as np
-import jsonlines
 import logging
-import traceback
-import re
-import subprocess
 
-s3 = monlam_ai_ocr_s3_client
-bucket_name = MONLAM_AI_OCR_BUCKET
-
-logging.basicConfig(filename='skipped_glyph.log', filemode='w', format='%(name)s - %(levelname)s - %(message)s')
-
-downloaded_images_dir = "../../data/pecing_font/Pecing_test_10_glyphs/downloaded_images"
+image_cache_dir = "../../data/pecing_font/image_cache"
+image_cache_max_bytes = 20 * 1024 ** 3
 cleaned_images_dir = "../../data/pecing_font/Pecing_test_10_glyphs/cleaned_images"
+# the cleaned 1-bit glyphs, bit-packed in a few shard files; the RGBA PNGs are only written on request
+bitmap_store_dir = "../../data/pecing_font/Pecing_test_10_glyphs/cleaned_bitmaps"
+save_cleaned_pngs = False
 svg_dir = "../../data/pecing_font/Pecing_test_10_glyphs/svg"
 jsonl_dir = "../../data/pecing_annotations/all_pecing_batches"
+# where the index of the accepted lines of each batch file is kept between runs
+annotation_index_dir = "../../data/pecing_annotations/index"
+progress_journal_path = "../../data/pecing_font/Pecing_test_10_glyphs/progress.jsonl"
+tracer_backend = "potrace"
+# set to a folder laid out like the bucket to run without S3
+local_images_dir = None
+# threads per stage; each stage holds at most stage_queue_size lines waiting for it
+fetch_workers = 8
+clean_workers = 2
+# the selection keeps every stack's samples until it has picked one, so it runs in one thread
+select_workers = 1
+trace_workers = os.cpu_count() or 1
+write_workers = 1
+stage_queue_size = 16
+# trace only the best of the samples of each stack
+select_best_sample = True
+samples_per_image_id = 10
 
-def download_image(image_url):
-    image_parts = (image_url.split("?")[0]).split("/")
-    obj_key = "/".join(image_parts[4:])
-    decoded_key = urllib.parse.unquote(obj_key)
-    image_name = decoded_key.split("/")[-1]
-    file_name, file_extension = os.path.splitext(image_name)
-    image_name_without_suffix = re.sub(r'(_\d+)$', '', file_name)
-    image_name_tibetan_only = re.sub(r'[^\u0F00-\u0FFF]', '', image_name_without_suffix)
-
-    try:
-        response = s3.get_object(Bucket=bucket_name, Key=decoded_key)
-        image_data = response['Body'].read()
-        with open(os.path.join(downloaded_images_dir, f"{image_name_tibetan_only}{file_extension}"), 'wb') as f:
-            f.write(image_data)
-    except Exception as e:
-        print(f"Error while downloading {image_name}: {e}")
-    return os.path.join(downloaded_images_dir, f"{image_name_tibetan_only}{file_extension}")
+def get_image_store():
+    if local_images_dir is not None:
+        store = LocalImageStore(local_images_dir)
+    else:
+        from config import MONLAM_AI_OCR_BUCKET, monlam_ai_ocr_s3_client
+        store = S3ImageStore(monlam_ai_ocr_s3_client, MONLAM_AI_OCR_BUCKET)
+    return CachedImageStore(store, ImageCache(image_cache_dir, image_cache_max_bytes))
 
-# Define output image path
-def get_image_output_path(cleaned_image, image_name, output_path, headlines):
-    headline_starts = headlines["headline_starts"]
-    headline_ends = headlines["headline_ends"]
-    glyph_name = image_name.split(".")[0].split("_")[0]
+def get_image_name(image_key):
+    """Returns the image file name reduced to its Tibetan characters, e.g. ཀ.png."""
+    file_extension = os.path.splitext(image_key.split("/")[-1])[1]
+    return f"{stack_from_image_key(image_key)}{file_extension}"
 
-    left_edge, right_edge = get_edges(cleaned_image)
+# Define glyph pixel metrics, relative to the headline
+def get_glyph_metrics(cleaned_glyph, headlines):
+    left_edge, right_edge = cleaned_glyph.left_edge, cleaned_glyph.right_edge
     if left_edge is None:
         return None
+    return {
+        "width_px": int(right_edge - left_edge),
+        "lsb_px": int(headlines["headline_starts"] - left_edge),
+        "rsb_px": int(right_edge - headlines["headline_ends"]),
+        "headline": [headlines["headline_starts"], headlines["headline_ends"]],
+    }
 
-    new_image_name = f"{glyph_name}_{int(right_edge - left_edge)}_{int(headline_starts - left_edge)}_{int(right_edge - headline_ends)}.png"
+# Define output image path
+def get_image_output_path(glyph_metrics, image_name, output_path):
+    glyph_name = image_name.split(".")[0].split("_")[0]
+    new_image_name = f"{glyph_name}_{glyph_metrics['width_px']}_{glyph_metrics['lsb_px']}_{glyph_metrics['rsb_px']}.png"
     image_output_path = os.path.join(output_path, new_image_name)
     return image_output_path
 
-# Define edge calculation function
-def get_edges(cleaned_image):
-    if cleaned_image.mode != '1':
-        cleaned_image = cleaned_image.convert('1')
-    image_array = np.array(cleaned_image)
-    image_array = image_array[:, 1:-1]
-    black_pixels = np.where(image_array == 0)
-    if black_pixels[0].size == 0 or black_pixels[1].size == 0:
-        return None, None
-
-    left_edge = np.min(black_pixels[1]) + 1
-    right_edge = np.max(black_pixels[1]) + 1
-    return left_edge, right_edge
-
 # Define headlines calculation function
 def get_headlines(baselines_coord):
     min_x = min(coord[0] for coord in baselines_coord)
@@ -76,8 +88,9 @@ def get_headlines(baselines_coord):
     }
     return headlines
 
-# Define PNG processing function
-def png_process(png_image_path, span, cleaned_image_path):
+# Define glyph cleaning function
+def clean_png(png_image_path, span, cleaned_image_path, image_name=None):
+    """Returns (cleaned_glyph, cleaned_image_output_path, glyph_metrics), or None when the glyph can't be cleaned."""
     baselines_coord = None
     polygon_points = None
     for info in span:
@@ -89,30 +102,26 @@ def png_process(png_image_path, span, cleaned_image_path):
         return None
 
     image = Image.open(png_image_path)
-    mask = Image.new("L", image.size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.polygon(polygon_points, fill=255)
-    cleaned_image = Image.new("RGB", image.size, (255, 255, 255))
-    cleaned_image.paste(image, mask=mask)
+    cleaned_glyph = clean_glyph_image(image, polygon_points)
 
-    headlines = get_headlines(baselines_coord)
+    glyph_metrics = get_glyph_metrics(cleaned_glyph, get_headlines(baselines_coord))
+    if glyph_metrics is None:
+        return None
     cleaned_image_path = get_image_output_path(
-        cleaned_image, os.path.basename(png_image_path), cleaned_image_path, headlines)
-
-    if cleaned_image_path is not None:
-        cleaned_image = cleaned_image.convert("RGBA") 
-        data = cleaned_image.getdata()
-        newData = []
-        for item in data:
-            if item[0] == 255 and item[1] == 255 and item[2] == 255:
-                newData.append((255, 255, 255, 0))
-            else:
-                newData.append(item)
-        cleaned_image.putdata(newData)
-        cleaned_image.save(cleaned_image_path)
-        return cleaned_image_path
-    else:
+        glyph_metrics, image_name or os.path.basename(png_image_path), cleaned_image_path)
+    return cleaned_glyph, cleaned_image_path, glyph_metrics
+
+def save_cleaned_image(cleaned_glyph, cleaned_image_path):
+    Image.fromarray(cleaned_glyph.rgba, "RGBA").save(cleaned_image_path)
+
+# Define PNG processing function
+def png_process(png_image_path, span, cleaned_image_path, image_name=None):
+    cleaned = clean_png(png_image_path, span, cleaned_image_path, image_name)
+    if cleaned is None:
         return None
+    cleaned_glyph, cleaned_image_path, _ = cleaned
+    save_cleaned_image(cleaned_glyph, cleaned_image_path)
+    return cleaned_image_path, cleaned_glyph.bitmap
 
 # Define bounding box calculation function
 def find_glyph_bbox(image):
@@ -121,60 +130,272 @@ def find_glyph_bbox(image):
     bbox = binary_image.getbbox()
     return bbox
 
-# Define PNG to SVG conversion function
-def png_to_svg(cleaned_image_path, svg_output_path):
-    image = Image.open(cleaned_image_path).convert('1')
-    pbm_path = "temp.pbm"
-    image.save(pbm_path)
-    sanitized_filename = re.sub('[^A-Za-z0-9_.]+', '', Path(cleaned_image_path).stem)
+def write_svg(svg, svg_output_path):
+    # write next to the output and rename, so readers never see a half-written SVG
+    fd, temp_svg_output_path = tempfile.mkstemp(suffix=".svg", dir=os.path.dirname(svg_output_path) or ".")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(svg)
+    os.replace(temp_svg_output_path, svg_output_path)
 
-    temp_svg_output_path = Path(f"{svg_dir}/{sanitized_filename}.svg")
+# Define PNG to SVG conversion function
+def png_to_svg(cleaned_image_path, svg_output_path, bitmap=None, tracer=None):
+    if bitmap is None:
+        bitmap = ~np.asarray(Image.open(cleaned_image_path).convert('1'))
+    if tracer is None:
+        tracer = get_tracer(tracer_backend)
+    write_svg(tracer.trace(bitmap), svg_output_path)
 
-    subprocess.run(["potrace", pbm_path, "-s", "--scale", "5.5", "-o", temp_svg_output_path])
-    os.remove(pbm_path)
+def trace_stored_glyphs(store, tracer=None, names=None):
+    """Traces the cleaned bitmaps of the store again, into the SVGs the pipeline wrote for them."""
+    if tracer is None:
+        tracer = get_tracer(tracer_backend)
+    for name in store.names() if names is None else names:
+        write_svg(trace_stored_bitmap(tracer, store, name), get_svg_output_path(name))
 
-    if os.path.exists(svg_output_path):
-        os.remove(svg_output_path)
-    os.rename(temp_svg_output_path, svg_output_path)
+def plan_accepted_lines(jsonl_paths, processed_ids, journal=None, shard=None, redo_finished=False):
+    """Returns the annotation index of each batch file with the entries of the lines to process.
 
-def main():
-    jsonl_paths = list(Path(jsonl_dir).iterdir())
-    processed_ids = {}
+    Those are the accepted lines, at most samples_per_image_id per image ID. With a shard, only
+    the lines of the stacks that belong to it. With a journal, lines it has already accepted
+    keep their place under the cap and finished lines are left out, unless redo_finished. Only
+    the indexes are read, so the number of lines of each stack is known before any line is decoded.
+    """
+    planned = []
     for jsonl_path in jsonl_paths:
         try:
-            with jsonlines.open(jsonl_path) as reader:
-                for line in reader:
-                    if line["answer"] == "accept":
-                        try:
-                            image_id = line["id"].split("_")[0]
-                            if image_id in processed_ids:
-                                if processed_ids[image_id] >= 10:
-                                    logging.info(f"Skipping duplicate ID: {image_id}")
-                                    continue
-                                else:
-                                    processed_ids[image_id] += 1
-                            else:
-                                processed_ids[image_id] = 1
-                            image_span = line["spans"]
-                            png_image_path = download_image(line["image"])
-
-                            cleaned_image_path = png_process(
-                                png_image_path, image_span, cleaned_images_dir)
-
-                            if cleaned_image_path is None:
-                                logging.info(f"Skipping {png_image_path}")
-                                continue
-                            filename = os.path.basename(cleaned_image_path)
-                            svg_output_path = Path(f"{svg_dir}/{Path(filename).stem}.svg")
-                            png_to_svg(cleaned_image_path, svg_output_path)
-
-                        except Exception as e:
-                            logging.error(f"Error processing image {line['image']}: {e}")
-                            traceback.print_exc()
+            index = AnnotationIndex.load(jsonl_path, annotation_index_dir)
         except Exception as e:
             logging.error(f"Error processing {jsonl_path}: {e}")
+            continue
+        entries = [entry for entry in index.entries if in_shard(entry.stack, shard)]
+        planned.append((index, list(select_accepted_entries(entries, processed_ids, journal, redo_finished))))
+    return planned
 
-if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
-    main()
+def read_accepted_lines(planned):
+    """Yields the decoded lines of the entries planned by plan_accepted_lines()."""
+    for index, entries in planned:
+        try:
+            yield from index.read_lines(entries)
+        except Exception as e:
+            logging.error(f"Error processing {index.jsonl_path}: {e}")
+
+def select_accepted_entries(entries, processed_ids, journal=None, redo_finished=False):
+    for entry in entries:
+        if journal is not None and journal.is_accepted(entry.id):
+            if redo_finished or not journal.is_finished(entry.id):
+                yield entry
+            continue
+        image_id = entry.id.split("_")[0]
+        if image_id in processed_ids:
+            if processed_ids[image_id] >= samples_per_image_id:
+                logging.info(f"Skipping duplicate ID: {image_id}")
+                continue
+            else:
+                processed_ids[image_id] += 1
+        else:
+            processed_ids[image_id] = 1
+        if journal is not None:
+            journal.record(entry.id, "accepted", image_id=image_id)
+        yield entry
+
+def get_svg_output_path(cleaned_image_path):
+    return Path(f"{svg_dir}/{Path(os.path.basename(cleaned_image_path)).stem}.svg")
+
+def get_line_stack(line):
+    return stack_from_image_key(image_key_from_url(line["image"]))
+
+def hold_sample(work):
+    """Shrinks a sample waiting for its stack's selection: the bitmap is bit-packed and the RGBA crop dropped."""
+    cleaned_glyph = work["cleaned_glyph"]
+    work["bitmap_width"] = cleaned_glyph.bitmap.shape[1]
+    work["cleaned_glyph"] = cleaned_glyph._replace(
+        rgba=cleaned_glyph.rgba if save_cleaned_pngs else None, bitmap=np.packbits(cleaned_glyph.bitmap, axis=1))
+
+def release_sample(work):
+    cleaned_glyph = work["cleaned_glyph"]
+    bitmap = np.unpackbits(cleaned_glyph.bitmap, axis=1, count=work.pop("bitmap_width")).astype(bool)
+    work["cleaned_glyph"] = cleaned_glyph._replace(bitmap=bitmap)
+    return work
+
+def get_glyph_polygon(span):
+    for info in span:
+        if info["label"] == "Glyph":
+            return [(x, y) for x, y in info["points"]]
+    return None
+
+def build_stages(store, tracer, journal, manifest, selector=None, bitmap_store=None):
+    """Returns the fetch, clean, trace and write stages; each passes a work dict on to the next.
+
+    With a selector, a select stage between clean and trace passes on only the best sample of each stack.
+    Lines that can't be cleaned are then passed on to it as skipped, so it knows when a stack is complete.
+    The write stage keeps the cleaned bitmaps in bitmap_store.
+    """
+    def fetch(work):
+        work["image"] = store.get(image_key_from_url(work["line"]["image"]))
+        journal.record(work["line"]["id"], "fetched")
+        return work
+
+    def clean(work):
+        image = work.pop("image")
+        cleaned = clean_png(
+            io.BytesIO(image.data), work["line"]["spans"], cleaned_images_dir, get_image_name(image.key))
+        if cleaned is None:
+            logging.info(f"Skipping {image.key}")
+            journal.record(work["line"]["id"], "skipped")
+            return {"line": work["line"], "skipped": True} if selector is not None else None
+        work["cleaned_glyph"], work["cleaned_image_path"], work["glyph_metrics"] = cleaned
+        work["source"] = image.key
+        work["source_sha1"] = hashlib.sha1(image.data).hexdigest()
+        journal.record(work["line"]["id"], "cleaned")
+        return work
+
+    def finish_selection(selection):
+        for reason, works in (("duplicate", selection.duplicates), ("not selected", selection.others)):
+            for work in works:
+                journal.record(work["line"]["id"], "skipped", reason=reason, selected=selection.best["line"]["id"])
+        journal.record(selection.best["line"]["id"], "selected")
+        return release_sample(selection.best)
+
+    def select(work):
+        stack = get_line_stack(work["line"])
+        if work.get("skipped"):
+            selection = selector.skip(stack)
+        else:
+            polygon_points = get_glyph_polygon(work["line"]["spans"])
+            selection = selector.add(stack, work, work["cleaned_glyph"], polygon_points)
+            hold_sample(work)
+        return None if selection is None else finish_selection(selection)
 
+    def flush_selections():
+        return [finish_selection(selection) for selection in selector.flush() if selection is not None]
+
+    def trace(work):
+        work["svg"] = tracer.trace(work["cleaned_glyph"].bitmap)
+        journal.record(work["line"]["id"], "traced")
+        return work
+
+    def write(work):
+        cleaned_glyph = work["cleaned_glyph"]
+        if save_cleaned_pngs:
+            save_cleaned_image(cleaned_glyph, work["cleaned_image_path"])
+        svg_output_path = get_svg_output_path(work["cleaned_image_path"])
+        write_svg(work["svg"], svg_output_path)
+        svg_name = os.path.basename(svg_output_path)
+        if bitmap_store is not None:
+            bitmap_store.add(Path(svg_name).stem, svg_name.split("_")[0], cleaned_glyph.bitmap,
+                             cleaned_glyph.box, work["glyph_metrics"])
+        manifest.add(glyph_record(
+            svg_name, svg_name.split("_")[0], source=work["source"], source_sha1=work["source_sha1"],
+            **work["glyph_metrics"]))
+        journal.record(work["line"]["id"], "written", svg=svg_name)
+        return work
+
+    stages = [
+        Stage("fetch", fetch, fetch_workers, stage_queue_size),
+        Stage("clean", clean, clean_workers, stage_queue_size),
+        Stage("trace", trace, trace_workers, stage_queue_size),
+        Stage("write", write, write_workers, stage_queue_size),
+    ]
+    if selector is not None:
+        stages.insert(2, Stage("select", select, select_workers, stage_queue_size, flush=flush_selections))
+    return stages
+
+def log_tracing_saved(selector, trace_stats):
+    """Logs how many samples the selection kept from potrace, and the tracing time that saved at the measured rate."""
+    counts = selector.counts
+    not_traced = counts["duplicates"] + counts["others"]
+    seconds_per_trace = trace_stats["seconds"] / trace_stats["items"] if trace_stats["items"] else 0.0
+    logging.info(f"select: {counts['samples']} samples of {counts['stacks']} stacks, "
+                 f"{counts['duplicates']} near-duplicates and {counts['others']} weaker samples not traced, "
+                 f"about {not_traced * seconds_per_trace:.1f}s of tracing saved")
+
+def use_shard_outputs(shard):
+    """Points the image cache, cleaned images and bitmaps, SVGs and progress journal at the shard's own copies."""
+    global image_cache_dir, cleaned_images_dir, bitmap_store_dir, svg_dir, progress_journal_path
+    image_cache_dir = shard_path(image_cache_dir, shard)
+    cleaned_images_dir = shard_path(cleaned_images_dir, shard)
+    bitmap_store_dir = shard_path(bitmap_store_dir, shard)
+    svg_dir = shard_path(svg_dir, shard)
+    progress_journal_path = shard_path(progress_journal_path, shard)
+    if save_cleaned_pngs:
+        os.makedirs(cleaned_images_dir, exist_ok=True)
+    os.makedirs(svg_dir, exist_ok=True)
+
+def main(resume=False, select_samples=None, work_queue=None, shard=None):
+    """Cleans and traces the accepted lines of every annotation batch, or of a work queue from coverage_planner.py.
+
+    A work queue adds to the SVGs already there and always resumes, so the manifest records and
+    the progress journal of earlier runs are kept. Its lines are processed even when the journal
+    has finished them, since coverage_planner.py queues the lines of SVGs that are missing or
+    empty. A shard takes the stacks that hash to it and writes to its own folders, which
+    merge_shards() combines once every shard is done; see --shard.
+    """
+    if shard is not None:
+        use_shard_outputs(shard)
+    if work_queue is not None:
+        resume = True
+    if select_samples is None:
+        select_samples = select_best_sample
+    jsonl_paths = [Path(work_queue)] if work_queue is not None else sorted(Path(jsonl_dir).iterdir())
+    store = get_image_store()
+    tracer = get_tracer(tracer_backend)
+    journal = ProgressJournal(progress_journal_path, resume)
+    manifest = GlyphManifestWriter(manifest_path(svg_dir), resume)
+    bitmap_store = BitmapStore(bitmap_store_dir, resume)
+    processed_ids = dict(journal.sample_counts)
+    planned = plan_accepted_lines(jsonl_paths, processed_ids, journal, shard, redo_finished=work_queue is not None)
+    accepted_lines = read_accepted_lines(planned)
+    selector = None
+    if select_samples:
+        # each stack is selected as soon as its last planned line has been cleaned
+        expected = Counter(entry.stack for _, entries in planned for entry in entries)
+        # the threads before the selector deliver samples in any order; ties go to the first line ID
+        selector = SampleSelector(samples_per_image_id, expected=expected, sample_key=lambda work: work["line"]["id"])
+
+    # every stage runs in its own threads, so downloads, cleaning and potrace overlap
+    try:
+        stats = run_pipeline(
+            ({"line": line} for line in accepted_lines),
+            build_stages(store, tracer, journal, manifest, selector, bitmap_store),
+            describe=lambda work: f"image {work['line']['image']}")
+    finally:
+        store.close()
+        journal.close()
+        manifest.close()
+        bitmap_store.close()
+    for stage_name, stage_stats in stats.items():
+        logging.info(f"{stage_name}: {stage_stats['items']} lines, {stage_stats['seconds']:.1f}s busy")
+    if selector is not None:
+        log_tracing_saved(selector, stats["trace"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the annotated glyph images and trace them to SVG.")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the lines the progress journal has finished instead of starting over")
+    parser.add_argument("--all-samples", action="store_true",
+                        help="trace every accepted sample instead of only the best one of each stack")
+    parser.add_argument("--work-queue",
+                        help="process only the lines of this work queue from coverage_planner.py; implies --resume")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="process only the stacks of shard i of N, into folders of its own; "
+                             "run every shard, one process or machine each, then --merge-shards N")
+    parser.add_argument("--retrace", action="store_true",
+                        help="trace the stored cleaned bitmaps again, without fetching or cleaning any image")
+    parser.add_argument("--merge-shards", type=int, metavar="N",
+                        help="copy the SVGs and cleaned images of N finished shards into the output folders "
+                             "and merge their manifests")
+    args = parser.parse_args()
+    log_path = 'skipped_glyph.log' if args.shard is None else shard_path('skipped_glyph.log', args.shard)
+    logging.basicConfig(filename=log_path, filemode='a' if args.resume or args.work_queue else 'w',
+                        format='%(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if args.merge_shards is not None:
+        merged = merge_shards(svg_dir, cleaned_images_dir, args.merge_shards, bitmap_store_dir)
+        print(f"Merged {merged} SVGs of {args.merge_shards} shards into {svg_dir}")
+    elif args.retrace:
+        if args.shard is not None:
+            use_shard_outputs(args.shard)
+        bitmap_store = BitmapStore(bitmap_store_dir, resume=True)
+        trace_stored_glyphs(bitmap_store)
+        bitmap_store.close()
+    else:
+        main(args.resume, not args.all_samples, args.work_queue, args.shard)
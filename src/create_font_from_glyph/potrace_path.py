@@ -0,0 +1,173 @@
+import re
+import numpy as np
+
+# Segment type of each point in an outline
+MOVE = 0
+LINE = 1
+CURVE_CONTROL = 2
+CURVE = 3
+
+POTRACE_PATH_CHARS = re.compile(r'[MmLlCcZz0-9eE.+\-\s,]*')
+PATH_COMMAND = re.compile(r'([MmLlCcZz])([^MmLlCcZz]*)')
+# potrace -s starts with one absolute or relative move, then only relative segments and moves
+POTRACE_COMMANDS = re.compile(r'[Mm][lc]*(?:z?m[lc]*)*z?')
+TRANSFORM_FUNCTION = re.compile(r'\s*(\w+)\s*\(([^)]*)\)\s*,?')
+
+
+def _cumulative(start, deltas):
+    """Adds relative points one after the other, the same way svg.path accumulates them."""
+    return np.cumsum(np.concatenate(([start], deltas)), axis=0)[1:]
+
+
+def parse_potrace_path_data(path_data):
+    """Parses the 'd' attribute written by potrace into (points, types, contour_ends) arrays.
+
+    Only M/L/C/Z commands (absolute or relative) are understood. Returns None for
+    anything else so the caller can fall back to svg.path.
+    """
+    if not POTRACE_PATH_CHARS.fullmatch(path_data):
+        return None
+    commands = PATH_COMMAND.findall(path_data)
+    if not commands:
+        return np.zeros((0, 2)), np.zeros(0, np.uint8), np.zeros(0, np.int64)
+
+    letters = ''.join(command for command, _ in commands)
+    arguments = [numbers.replace(',', ' ').split() for _, numbers in commands]
+    if not POTRACE_COMMANDS.fullmatch(letters) or (letters[0] == 'M' and len(arguments[0]) != 2):
+        return _parse_path_commands(commands)
+
+    counts = np.array([len(numbers) for numbers in arguments])
+    codes = np.frombuffer(letters.encode(), np.uint8)
+    is_curve = codes == ord('c')
+    is_close = codes == ord('z')
+    if (np.any(counts[is_curve] % 6) or np.any(counts[~is_curve] % 2)
+            or np.any(counts[is_close]) or not np.all(counts[~is_close])):
+        return None
+    try:
+        points = np.array([number for numbers in arguments for number in numbers], dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        return None
+
+    # segment type of every point, from the command it belongs to and its position in it
+    pairs = counts // 2
+    point_codes = np.repeat(codes, pairs)
+    position = np.arange(len(points)) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    types = np.full(len(points), LINE, np.uint8)
+    curve_points = point_codes == ord('c')
+    types[curve_points] = np.where(position[curve_points] % 3 == 2, CURVE, CURVE_CONTROL)
+    types[((point_codes == ord('m')) | (point_codes == ord('M'))) & (position == 0)] = MOVE
+
+    contour_starts = np.flatnonzero(types == MOVE)
+    contour_ends = np.append(contour_starts[1:] - 1, len(points) - 1)
+    # a move right after 'z' is relative to the start of the closed subpath
+    move_commands = np.flatnonzero((codes == ord('m')) | (codes == ord('M')))
+    after_close = np.zeros(len(move_commands), dtype=bool)
+    after_close[1:] = is_close[move_commands[1:] - 1]
+
+    on_curve = types != CURVE_CONTROL
+    # rank of the last on-curve point at or before each point, i.e. where a segment starts
+    segment_start = np.cumsum(on_curve) - 1
+    absolute = np.empty_like(points)
+    current = start = np.zeros(2)
+    for start_index, end_index, closed in zip(contour_starts.tolist(), (contour_ends + 1).tolist(), after_close):
+        block = slice(start_index, end_index)
+        on_points = _cumulative(start if closed else current, points[block][on_curve[block]])
+        ranks = segment_start[block] - segment_start[start_index]
+        absolute[block] = np.where(on_curve[block, None], on_points[ranks], on_points[ranks] + points[block])
+        start = on_points[0]
+        current = on_points[-1]
+    return absolute, types, contour_ends
+
+
+def _parse_path_commands(commands):
+    """Parses M/L/C/Z commands one at a time, for paths not laid out the way potrace writes them."""
+    chunks = []
+    types = []
+    contour_ends = []
+    n_points = 0
+    current = np.zeros(2)
+    start = np.zeros(2)
+    for command, arguments in commands:
+        try:
+            numbers = np.array(arguments.replace(',', ' ').split(), dtype=np.float64)
+        except ValueError:
+            return None
+        upper = command.upper()
+        relative = command != upper
+
+        if upper == 'Z':
+            if len(numbers):
+                return None
+            current = start
+            continue
+        if upper == 'C':
+            if len(numbers) == 0 or len(numbers) % 6:
+                return None
+            segments = numbers.reshape(-1, 3, 2)
+            if relative:
+                ends = _cumulative(current, segments[:, 2])
+                segment_starts = np.concatenate(([current], ends[:-1]))
+                segments = segments + segment_starts[:, None, :]
+                segments[:, 2] = ends
+            points = segments.reshape(-1, 2)
+            chunks.append(points)
+            types.append(np.tile(np.array([CURVE_CONTROL, CURVE_CONTROL, CURVE], np.uint8), len(segments)))
+        else:
+            if len(numbers) == 0 or len(numbers) % 2:
+                return None
+            points = numbers.reshape(-1, 2)
+            if relative:
+                points = _cumulative(current, points)
+            chunk_types = np.full(len(points), LINE, np.uint8)
+            if upper == 'M':
+                # extra coordinate pairs after a move are implicit line-tos
+                if n_points:
+                    contour_ends.append(n_points - 1)
+                chunk_types[0] = MOVE
+                start = points[0]
+            elif upper != 'L':
+                return None
+            chunks.append(points)
+            types.append(chunk_types)
+        n_points += len(points)
+        current = points[-1]
+
+    if not chunks:
+        return np.zeros((0, 2)), np.zeros(0, np.uint8), np.zeros(0, np.int64)
+    if types[0][0] != MOVE:
+        return None
+    contour_ends.append(n_points - 1)
+    return np.concatenate(chunks), np.concatenate(types), np.array(contour_ends, np.int64)
+
+
+def parse_svg_transform(transform):
+    """Parses an SVG transform attribute into a 2x3 affine matrix."""
+    matrix = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+    position = 0
+    transform = transform.strip()
+    while position < len(transform):
+        match = TRANSFORM_FUNCTION.match(transform, position)
+        if match is None:
+            raise ValueError(f"unsupported SVG transform: {transform}")
+        name, arguments = match.groups()
+        values = [float(value) for value in arguments.replace(',', ' ').split()]
+        if name == 'translate':
+            tx, ty = (values + [0.0])[:2]
+            step = [[1.0, 0.0, tx], [0.0, 1.0, ty]]
+        elif name == 'scale':
+            sx, sy = (values + values)[:2]
+            step = [[sx, 0.0, 0.0], [0.0, sy, 0.0]]
+        elif name == 'matrix' and len(values) == 6:
+            a, b, c, d, e, f = values
+            step = [[a, c, e], [b, d, f]]
+        else:
+            raise ValueError(f"unsupported SVG transform: {transform}")
+        # later functions in the list are applied to the points first
+        matrix = compose_transforms(matrix, np.array(step))
+        position = match.end()
+    return matrix
+
+
+def compose_transforms(outer, inner):
+    """Returns the 2x3 matrix that applies inner first, then outer."""
+    return np.concatenate((outer[:, :2] @ inner[:, :2], (outer[:, :2] @ inner[:, 2] + outer[:, 2])[:, None]), axis=1)
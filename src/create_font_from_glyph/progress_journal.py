@@ -0,0 +1,70 @@
+from collections import Counter, defaultdict
+import json
+import os
+import threading
+
+# stages after which a line needs no more work
+FINAL_STAGES = {"written", "skipped"}
+
+
+class ProgressJournal:
+    """Append-only JSONL record of the stages each annotation line has been through.
+
+    Every record is flushed as soon as it is written, so after a crash the journal says which
+    lines were accepted (and count towards their image ID's sample cap) and which are finished.
+    Without resume the journal starts empty.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.stages = defaultdict(set)
+        self.sample_counts = Counter()
+        self.lock = threading.Lock()
+        if resume:
+            self._load()
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if self.file.tell() and not self._ends_with_newline():
+            # end the line a crash left half written, so the next record starts a line of its own
+            self.file.write("\n")
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for journal_line in f:
+                try:
+                    record = json.loads(journal_line)
+                except ValueError:
+                    # a crash can leave the last line half written
+                    continue
+                self._apply(record)
+
+    def _apply(self, record):
+        self.stages[record["id"]].add(record["stage"])
+        if record["stage"] == "accepted":
+            self.sample_counts[record["image_id"]] += 1
+
+    def record(self, line_id, stage, **fields):
+        record = {"id": line_id, "stage": stage, **fields}
+        with self.lock:
+            self._apply(record)
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def is_accepted(self, line_id):
+        with self.lock:
+            return "accepted" in self.stages.get(line_id, ())
+
+    def is_finished(self, line_id):
+        with self.lock:
+            return bool(self.stages.get(line_id, set()) & FINAL_STAGES)
+
+    def close(self):
+        self.file.close()
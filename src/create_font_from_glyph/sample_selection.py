@@ -0,0 +1,173 @@
+from collections import Counter, namedtuple
+import numpy as np
+from glyph_image_cleaning import polygon_mask
+
+HASH_SIZE = 8
+# samples whose average and difference hashes both differ in at most this many of their 64 bits
+DUPLICATE_DISTANCE = 4
+
+SampleQuality = namedtuple("SampleQuality", ["coverage", "sharpness", "polygon_fit"])
+# best is the sample to trace; duplicates and others are the samples it was chosen over
+StackSelection = namedtuple("StackSelection", ["stack", "best", "duplicates", "others"])
+
+
+def _grid_means(image, height, width):
+    """Area-averages a 2-D array down to a (height, width) grid."""
+    rows = np.arange(image.shape[0]) * height // image.shape[0]
+    columns = np.arange(image.shape[1]) * width // image.shape[1]
+    cells = (rows[:, None] * width + columns[None, :]).ravel()
+    sums = np.bincount(cells, weights=image.ravel(), minlength=height * width)
+    counts = np.bincount(cells, minlength=height * width)
+    return (sums / np.maximum(counts, 1)).reshape(height, width)
+
+
+def _ink_crop(bitmap):
+    rows = np.flatnonzero(bitmap.any(axis=1))
+    columns = np.flatnonzero(bitmap.any(axis=0))
+    if not len(rows):
+        return bitmap
+    return bitmap[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+
+
+def perceptual_hash(bitmap, size=HASH_SIZE):
+    """Returns the average hash and difference hash bits of the ink, as one bool array of 2 * size * size bits.
+
+    Both are taken over the ink's bounding box, so where the glyph sits in its crop doesn't matter.
+    """
+    ink = _ink_crop(bitmap).astype(np.float64)
+    average = _grid_means(ink, size, size)
+    difference = _grid_means(ink, size, size + 1)
+    return np.concatenate(((average > average.mean()).ravel(), (difference[:, 1:] > difference[:, :-1]).ravel()))
+
+
+def _erode(mask):
+    """Keeps the pixels whose four neighbours are set too."""
+    padded = np.pad(mask, 1)
+    return mask & padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:]
+
+
+def sample_quality(cleaned_glyph, polygon_points):
+    """Returns the ink coverage, edge sharpness and polygon fit of a cleaned glyph sample.
+
+    coverage is the share of the annotation polygon that is ink. sharpness is the mean gray
+    level gradient along the ink's outline, 0 to 1; blurry or faint prints score low.
+    polygon_fit is the share of the polygon's outline that doesn't cut through ink; a polygon
+    drawn through a stroke clips the glyph.
+    """
+    bitmap = cleaned_glyph.bitmap
+    left, upper = cleaned_glyph.box[:2]
+    mask = polygon_mask(bitmap.shape[::-1], [(x - left, y - upper) for x, y in polygon_points])
+    coverage = bitmap.sum() / max(mask.sum(), 1)
+
+    gray = cleaned_glyph.rgba[..., :3].mean(axis=-1)
+    gradient_y, gradient_x = np.gradient(gray)
+    outline = bitmap & ~_erode(bitmap)
+    sharpness = np.hypot(gradient_x, gradient_y)[outline].mean() / 255 if outline.any() else 0.0
+
+    mask_outline = mask & ~_erode(mask)
+    polygon_fit = 1 - (bitmap & mask_outline).sum() / max(mask_outline.sum(), 1)
+    return SampleQuality(float(coverage), float(sharpness), float(polygon_fit))
+
+
+def hash_distances(hashes):
+    """Returns the pairwise average hash and difference hash distances of stacked hash bits."""
+    half = hashes.shape[1] // 2
+    different = hashes[:, None, :] != hashes[None, :, :]
+    return different[..., :half].sum(axis=-1), different[..., half:].sum(axis=-1)
+
+
+def quality_scores(qualities):
+    """Scores the samples of a stack, higher is better.
+
+    Sharpness and polygon fit count as they are; coverage counts by how close it is to the
+    stack's median, since both broken strokes and ink blots move it away.
+    """
+    coverage, sharpness, polygon_fit = np.array(qualities, dtype=np.float64).reshape(-1, 3).T
+    median = np.median(coverage)
+    agreement = np.minimum(coverage, median) / np.maximum(np.maximum(coverage, median), 1e-9)
+    return sharpness * polygon_fit * agreement
+
+
+def select_samples(stack, samples, qualities, hashes, duplicate_distance=DUPLICATE_DISTANCE):
+    """Returns the StackSelection of the best sample of a stack.
+
+    Going from the best score down, a sample within duplicate_distance of a sample already kept
+    is a near-duplicate of it; duplicates don't count towards the median coverage.
+    """
+    average_distances, difference_distances = hash_distances(np.array(hashes))
+    near = (average_distances <= duplicate_distance) & (difference_distances <= duplicate_distance)
+    order = np.argsort(-quality_scores(qualities), kind='stable')
+    kept = []
+    duplicates = []
+    for index in order.tolist():
+        if any(near[index, kept_index] for kept_index in kept):
+            duplicates.append(index)
+        else:
+            kept.append(index)
+    if duplicates:
+        # score again without the duplicates, which would otherwise pull the median towards themselves
+        scores = quality_scores([qualities[index] for index in kept])
+        kept = [kept[index] for index in np.argsort(-scores, kind='stable').tolist()]
+    best = samples[kept[0]]
+    return StackSelection(stack, best, [samples[index] for index in duplicates], [samples[index] for index in kept[1:]])
+
+
+class SampleSelector:
+    """Collects the cleaned samples of each stack and picks the one to trace.
+
+    expected maps each stack to the number of its samples coming; a stack not in it is expected
+    to have samples_per_stack. Once all of a stack's samples have arrived, added with add() or
+    counted with skip() when they were dropped before they could be scored, the call returns the
+    stack's selection. flush() returns the selections of the stacks still open at the end of the
+    stream, those that lost a sample to an error. Only the quality and hash of each sample are
+    computed here; the caller decides how much of the sample to hold. Samples of equal score go
+    to the first one, in the order they arrived, or sorted by sample_key when given. Not
+    thread-safe; run it in a single pipeline worker.
+    """
+
+    def __init__(self, samples_per_stack=10, duplicate_distance=DUPLICATE_DISTANCE, expected=None, sample_key=None):
+        self.samples_per_stack = samples_per_stack
+        self.duplicate_distance = duplicate_distance
+        self.expected = dict(expected or {})
+        self.sample_key = sample_key
+        self.arrived = Counter()
+        self.stacks = {}
+        self.counts = Counter()
+
+    def add(self, stack, sample, cleaned_glyph, polygon_points):
+        samples = self.stacks.setdefault(stack, ([], [], []))
+        samples[0].append(sample)
+        samples[1].append(sample_quality(cleaned_glyph, polygon_points))
+        samples[2].append(perceptual_hash(cleaned_glyph.bitmap))
+        self.counts["samples"] += 1
+        return self._arrive(stack)
+
+    def skip(self, stack):
+        self.counts["skipped"] += 1
+        return self._arrive(stack)
+
+    def _arrive(self, stack):
+        self.arrived[stack] += 1
+        if self.arrived[stack] >= self.expected.get(stack, self.samples_per_stack):
+            return self._select(stack)
+        return None
+
+    def flush(self):
+        selections = [self._select(stack) for stack in list(self.stacks)]
+        self.arrived.clear()
+        return selections
+
+    def _select(self, stack):
+        del self.arrived[stack]
+        if stack not in self.stacks:
+            # every sample of the stack was skipped
+            return None
+        samples, qualities, hashes = self.stacks.pop(stack)
+        if self.sample_key is not None:
+            order = sorted(range(len(samples)), key=lambda index: self.sample_key(samples[index]))
+            samples, qualities, hashes = ([values[index] for index in order] for values in (samples, qualities, hashes))
+        selection = select_samples(stack, samples, qualities, hashes, self.duplicate_distance)
+        self.counts["stacks"] += 1
+        self.counts["duplicates"] += len(selection.duplicates)
+        self.counts["others"] += len(selection.others)
+        return selection
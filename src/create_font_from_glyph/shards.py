@@ -0,0 +1,103 @@
+from collections import namedtuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from bitmap_store import BitmapStore
+from glyph_manifest import manifest_path, read_manifest
+
+# shard index of count shards, as given to --shard index/count
+Shard = namedtuple("Shard", ["index", "count"])
+
+
+def parse_shard(text):
+    """Parses "i/N" into a Shard; i counts from 0."""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard '{text}' is not of the form i/N")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard '{text}' needs 0 <= i < N")
+    return Shard(index, count)
+
+
+def shard_of(stack, count):
+    """Returns the shard a stack belongs to: the same on every machine and run, unlike hash()."""
+    digest = hashlib.sha1(stack.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def in_shard(stack, shard):
+    return shard is None or shard_of(stack, shard.count) == shard.index
+
+
+def shard_path(path, shard):
+    """Returns the shard's own file or folder next to path, e.g. svg-shard-0-of-4 for svg."""
+    root, extension = os.path.splitext(path)
+    return f"{root}-shard-{shard.index}-of-{shard.count}{extension}"
+
+
+def copy_files(file_names, source_dir, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    for file_name in file_names:
+        shutil.copyfile(os.path.join(source_dir, file_name), os.path.join(target_dir, file_name))
+
+
+def merge_bitmap_store(target, source, names):
+    """Adds the named bitmaps of source to target, unless target already holds the same bitmap under that name."""
+    for name in sorted(names):
+        if name not in source:
+            continue
+        record = source.record(name)
+        if name in target and np.array_equal(target.packed(name), source.packed(name)):
+            continue
+        target.add(name, record.stack, source.bitmap(name), record.box, record.glyph_metrics)
+
+
+def merge_shards(svg_dir, cleaned_images_dir, shard_count, bitmap_store_dir=None):
+    """Copies the SVGs and cleaned images of every shard into the output folders and merges their manifests.
+
+    The records already in svg_dir's manifest are kept unless a shard wrote the same SVG. The
+    merged manifest is sorted by SVG name, so it comes out the same whichever shard finished
+    first. Shards hold disjoint stacks; an SVG found in two of them is an error. With
+    bitmap_store_dir, the shards' cleaned bitmaps are added to that store in the same order.
+    Returns the number of records merged from the shards.
+    """
+    shard_records = {}
+    bitmap_store = BitmapStore(bitmap_store_dir, resume=True) if bitmap_store_dir is not None else None
+    for index in range(shard_count):
+        shard = Shard(index, shard_count)
+        shard_svg_dir = shard_path(svg_dir, shard)
+        if not os.path.isdir(shard_svg_dir):
+            logging.warning(f"No output for shard {index}/{shard_count} in {shard_svg_dir}")
+            continue
+        records = {svg_name: record for svg_name, record in read_manifest(shard_svg_dir).items()
+                   if os.path.exists(os.path.join(shard_svg_dir, svg_name))}
+        duplicates = sorted(set(records) & set(shard_records))
+        if duplicates:
+            raise ValueError(f"{len(duplicates)} SVGs are in more than one shard, e.g. {duplicates[0]}")
+        copy_files(records, shard_svg_dir, svg_dir)
+        shard_cleaned_dir = shard_path(cleaned_images_dir, shard)
+        if os.path.isdir(shard_cleaned_dir):
+            copy_files(os.listdir(shard_cleaned_dir), shard_cleaned_dir, cleaned_images_dir)
+        shard_bitmap_store_dir = shard_path(bitmap_store_dir, shard) if bitmap_store is not None else None
+        if shard_bitmap_store_dir is not None and os.path.isdir(shard_bitmap_store_dir):
+            shard_bitmap_store = BitmapStore(shard_bitmap_store_dir, resume=True)
+            names = [os.path.splitext(svg_name)[0] for svg_name in records]
+            merge_bitmap_store(bitmap_store, shard_bitmap_store, names)
+            shard_bitmap_store.close()
+        shard_records.update(records)
+    if bitmap_store is not None:
+        bitmap_store.close()
+
+    records = {**read_manifest(svg_dir), **shard_records} if os.path.isdir(svg_dir) else shard_records
+    os.makedirs(svg_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".jsonl", dir=svg_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for svg_name in sorted(records):
+            f.write(json.dumps(records[svg_name], ensure_ascii=False) + "\n")
+    os.replace(temp_path, manifest_path(svg_dir))
+    return len(shard_records)
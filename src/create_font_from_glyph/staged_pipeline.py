@@ -0,0 +1,94 @@
+import logging
+import queue
+import threading
+import time
+import traceback
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a streaming pipeline.
+
+    func runs on each item in `workers` threads and returns the item for the next stage,
+    or None to drop it. The stage reads from a queue of at most queue_size items, so when
+    it falls behind, the stages before it block instead of piling up work in memory.
+    A stage that holds items back returns them from flush, which runs once after its last item.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=16, flush=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.flush = flush
+
+
+def run_pipeline(source, stages, describe=repr):
+    """Feeds the items of source through the stages and waits until all of them are done.
+
+    Errors are logged with describe(item) and drop the item. Returns the number of items
+    and the busy seconds of each stage.
+    """
+    queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+    stats = {stage.name: {"items": 0, "seconds": 0.0} for stage in stages}
+    stats_lock = threading.Lock()
+    running = [stage.workers for stage in stages]
+    threads = []
+
+    def work(index):
+        stage = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                logging.error(f"Error in {stage.name} stage for {describe(item)}: {e}")
+                traceback.print_exc()
+                result = None
+            with stats_lock:
+                stats[stage.name]["items"] += 1
+                stats[stage.name]["seconds"] += time.perf_counter() - start
+            if result is not None and outbox is not None:
+                outbox.put(result)
+        with stats_lock:
+            running[index] -= 1
+            last_worker = running[index] == 0
+        if last_worker and stage.flush is not None:
+            start = time.perf_counter()
+            try:
+                held = stage.flush()
+            except Exception as e:
+                logging.error(f"Error flushing {stage.name} stage: {e}")
+                traceback.print_exc()
+                held = []
+            with stats_lock:
+                stats[stage.name]["seconds"] += time.perf_counter() - start
+            for result in held:
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+        # the last worker of a stage tells every worker of the next stage to stop
+        if last_worker and outbox is not None:
+            for _ in range(stages[index + 1].workers):
+                outbox.put(_DONE)
+
+    for index, stage in enumerate(stages):
+        for worker in range(stage.workers):
+            thread = threading.Thread(target=work, args=(index,), name=f"{stage.name}-{worker}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    try:
+        for item in source:
+            queues[0].put(item)
+    finally:
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+    return stats
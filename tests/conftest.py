@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the modules import each other by bare name, as when they are run as scripts from their folder
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "src", "create_font_from_glyph"))
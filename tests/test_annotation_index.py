@@ -0,0 +1,90 @@
+import json
+import os
+
+import annotation_index
+from annotation_index import AnnotationIndex, build_entries, index_path, stack_from_image_key
+
+BUCKET_URL = "https://s3.amazonaws.com/monlam.ai.ocr/derge/pages"
+
+
+def annotation_line(line_id, image_name, answer="accept"):
+    return json.dumps({"id": line_id, "image": f"{BUCKET_URL}/{image_name}", "answer": answer},
+                      ensure_ascii=False)
+
+
+def write_batch(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding='utf-8')
+    return str(path)
+
+
+def test_stack_from_image_key():
+    assert stack_from_image_key("pages/ཀ_12.png") == "ཀ"
+    assert stack_from_image_key("pages/བསྒྲུབས_3.jpg") == "བསྒྲུབས"
+    assert stack_from_image_key("pages/x-ཀྱ_2.png") == "ཀྱ"
+
+
+def test_build_entries_keeps_accepted_lines(tmp_path, caplog):
+    lines = [
+        annotation_line("a", "ཀ_1.png"),
+        annotation_line("b", "ཁ_1.png", answer="reject"),
+        '{"answer": "accept", broken',
+        "",
+        annotation_line("c", "ཀྱ_2.png"),
+        annotation_line("d", "accept_1.png", answer="ignore"),
+    ]
+    jsonl_path = write_batch(tmp_path / "batch.jsonl", lines)
+    entries = build_entries(jsonl_path)
+    assert [(entry.id, entry.stack) for entry in entries] == [("a", "ཀ"), ("c", "ཀྱ")]
+    assert entries[0].image_key.endswith("ཀ_1.png")
+    assert "line 3" in caplog.text
+    with open(jsonl_path, 'rb') as f:
+        data = f.read()
+    for entry, line in zip(entries, [lines[0], lines[4]]):
+        assert data[entry.offset:entry.offset + entry.length] == (line + "\n").encode('utf-8')
+
+
+def test_read_lines_seeks_to_the_entries(tmp_path):
+    jsonl_path = write_batch(tmp_path / "batch.jsonl", [
+        annotation_line("a", "ཀ_1.png"), annotation_line("b", "ཁ_1.png", "reject"), annotation_line("c", "ག_1.png")])
+    index = AnnotationIndex.load(jsonl_path)
+    assert [line["id"] for line in index.read_lines()] == ["a", "c"]
+    assert [line["id"] for line in index.read_lines(index.entries[1:])] == ["c"]
+
+
+def test_saved_index_is_reused_until_the_batch_changes(tmp_path, monkeypatch):
+    jsonl_path = write_batch(tmp_path / "batch.jsonl", [annotation_line("a", "ཀ_1.png")])
+    index_dir = str(tmp_path / "indexes")
+    first = AnnotationIndex.load(jsonl_path, index_dir)
+    assert os.path.exists(index_path(jsonl_path, index_dir))
+
+    build_entries = annotation_index.build_entries
+    builds = []
+
+    def recording(path):
+        builds.append(path)
+        return build_entries(path)
+
+    monkeypatch.setattr(annotation_index, "build_entries", recording)
+    assert AnnotationIndex.load(jsonl_path, index_dir).entries == first.entries
+    assert builds == []
+
+    write_batch(tmp_path / "batch.jsonl", [annotation_line("a", "ཀ_1.png"), annotation_line("b", "ཁ_1.png")])
+    os.utime(jsonl_path, ns=(0, os.stat(jsonl_path).st_mtime_ns + 10 ** 9))
+    assert [entry.id for entry in AnnotationIndex.load(jsonl_path, index_dir).entries] == ["a", "b"]
+    assert builds == [jsonl_path]
+
+
+def test_broken_index_is_rebuilt(tmp_path):
+    jsonl_path = write_batch(tmp_path / "batch.jsonl", [annotation_line("a", "ཀ_1.png")])
+    index_dir = str(tmp_path / "indexes")
+    os.makedirs(index_dir)
+    with open(index_path(jsonl_path, index_dir), 'w') as f:
+        f.write('{"version": 1, "entr')
+    assert [entry.id for entry in AnnotationIndex.load(jsonl_path, index_dir).entries] == ["a"]
+
+
+def test_batches_of_the_same_name_get_their_own_index(tmp_path):
+    first = index_path(str(tmp_path / "one" / "batch.jsonl"), "indexes")
+    second = index_path(str(tmp_path / "two" / "batch.jsonl"), "indexes")
+    assert first != second
+    assert os.path.basename(first).startswith("batch.jsonl.")
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+
+from bitmap_store import INDEX_NAME, BitmapStore, shard_file_name
+from glyph_tracing import bitmap_to_pbm
+
+
+def random_bitmap(seed, height=13, width=21):
+    return np.random.default_rng(seed).random((height, width)) < 0.4
+
+
+def test_round_trip_and_pbm(tmp_path):
+    store = BitmapStore(str(tmp_path))
+    bitmaps = {f"ཀ_{width}_1_2": random_bitmap(width, width=width) for width in (1, 8, 21)}
+    for name, bitmap in bitmaps.items():
+        store.add(name, "ཀ", bitmap, box=(0, 0, bitmap.shape[1], bitmap.shape[0]), glyph_metrics=[1, 2])
+    for name, bitmap in bitmaps.items():
+        assert np.array_equal(store.bitmap(name), bitmap)
+        assert store.pbm(name) == bitmap_to_pbm(bitmap)
+    assert store.record("ཀ_8_1_2").box == [0, 0, 8, 13]
+    store.close()
+
+
+def test_shards_rotate_and_reload(tmp_path):
+    store = BitmapStore(str(tmp_path), shard_max_bytes=100)
+    names = [f"ཀ_{index}" for index in range(5)]
+    for index, name in enumerate(names):
+        # 13 rows of 3 bytes, so two bitmaps fill a shard
+        store.add(name, "ཀ", random_bitmap(index))
+    assert [store.record(name).shard for name in names] == [0, 0, 1, 1, 2]
+    assert np.array_equal(store.bitmap(names[0]), random_bitmap(0))
+    store.close()
+
+    resumed = BitmapStore(str(tmp_path), resume=True, shard_max_bytes=100)
+    assert resumed.names() == names
+    assert all(np.array_equal(resumed.bitmap(name), random_bitmap(index)) for index, name in enumerate(names))
+    # the last shard has room for one more
+    record = resumed.add("ཁ_0", "ཁ", random_bitmap(9))
+    assert (record.shard, record.offset) == (2, 39)
+    resumed.close()
+
+
+def test_names_by_stack_and_replacement(tmp_path):
+    store = BitmapStore(str(tmp_path))
+    store.add("ཀ_1", "ཀ", random_bitmap(1))
+    store.add("ཁ_1", "ཁ", random_bitmap(2))
+    store.add("ཀ_1", "ཀ", random_bitmap(3))
+    assert store.names("ཀ") == ["ཀ_1"]
+    assert store.names("ག") == []
+    assert len(store) == 2 and "ཁ_1" in store
+    assert np.array_equal(store.bitmap("ཀ_1"), random_bitmap(3))
+    store.close()
+
+
+def test_resume_ignores_what_a_crash_left(tmp_path):
+    store = BitmapStore(str(tmp_path))
+    store.add("ཀ_1", "ཀ", random_bitmap(1))
+    store.add("ཀ_2", "ཀ", random_bitmap(2))
+    store.close()
+    # the last bitmap lost its bytes, and an index line was cut short
+    shard_path = os.path.join(str(tmp_path), shard_file_name(0))
+    os.truncate(shard_path, os.path.getsize(shard_path) - 1)
+    with open(os.path.join(str(tmp_path), INDEX_NAME), 'a', encoding='utf-8') as f:
+        f.write('{"name": "ཀ_3", "sta')
+
+    resumed = BitmapStore(str(tmp_path), resume=True)
+    assert resumed.names() == ["ཀ_1"]
+    resumed.add("ཀ_4", "ཀ", random_bitmap(4))
+    resumed.close()
+    reloaded = BitmapStore(str(tmp_path), resume=True)
+    assert reloaded.names() == ["ཀ_1", "ཀ_4"]
+    assert np.array_equal(reloaded.bitmap("ཀ_4"), random_bitmap(4))
+    reloaded.close()
+
+
+def test_without_resume_the_store_starts_empty(tmp_path):
+    store = BitmapStore(str(tmp_path))
+    store.add("ཀ_1", "ཀ", random_bitmap(1))
+    store.close()
+    store = BitmapStore(str(tmp_path))
+    assert len(store) == 0
+    store.close()
+    assert sorted(os.listdir(str(tmp_path))) == [shard_file_name(0), INDEX_NAME]
+    assert os.path.getsize(os.path.join(str(tmp_path), shard_file_name(0))) == 0
@@ -0,0 +1,96 @@
+import json
+
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+import pipeline_for_font_creation
+from build_cache import GlyphBuildCache, glyph_metrics
+from pipeline_for_font_creation import compile_glyphs, compile_glyphs_incremental
+
+SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="100pt" height="100pt" viewBox="0 0 100 100">
+<g transform="translate(0,100) scale(0.1,-0.1)"><path d="{}"/></g>
+</svg>
+"""
+
+
+def write_svg(folder, name, path_data):
+    svg_file = folder / name
+    svg_file.write_text(SVG.format(path_data), encoding='utf-8')
+    return str(svg_file)
+
+
+def square_glyph():
+    pen = TTGlyphPen(None)
+    pen.moveTo((10, 20))
+    pen.lineTo((110, 20))
+    pen.lineTo((110, 70))
+    pen.closePath()
+    pen.moveTo((0, 0))
+    pen.lineTo((5, 5))
+    pen.lineTo((0, 5))
+    pen.closePath()
+    glyph = pen.glyph()
+    glyph.recalcBounds(None)
+    return glyph.compile(None)
+
+
+def test_glyph_metrics():
+    assert glyph_metrics(square_glyph()) == {"bounds": [0, 0, 110, 70], "contours": 2, "points": 6}
+    assert glyph_metrics(b"") == {"bounds": None, "contours": 0, "points": 0}
+
+
+def test_keys_follow_content_and_params(tmp_path):
+    first = write_svg(tmp_path, "ཀ_1.svg", "M0 0 l10 0 0 10 z")
+    same = write_svg(tmp_path, "ཀ_2.svg", "M0 0 l10 0 0 10 z")
+    other = write_svg(tmp_path, "ཁ_1.svg", "M0 0 l20 0 0 20 z")
+    cache = GlyphBuildCache(str(tmp_path / "cache.json"), {"version": 1})
+    assert cache.key(first) == cache.key(same)
+    assert cache.key(first) != cache.key(other)
+    assert GlyphBuildCache(str(tmp_path / "cache.json"), {"version": 2}).key(first) != cache.key(first)
+
+
+def test_save_keeps_only_the_used_entries(tmp_path):
+    path = tmp_path / "cache" / "build_cache.json"
+    cache = GlyphBuildCache(str(path), {"version": 1})
+    cache.put("used", square_glyph())
+    cache.put("removed", b"")
+    assert cache.save(["used"]) == 1
+    reloaded = GlyphBuildCache(str(path), {"version": 1})
+    assert reloaded.get("used") == square_glyph()
+    assert reloaded.get("removed") is None
+    assert json.loads(path.read_text())["used"]["points"] == 6
+
+
+def test_broken_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "build_cache.json"
+    path.write_text('{"half')
+    assert GlyphBuildCache(str(path), {}).entries == {}
+
+
+def test_incremental_build_compiles_only_changed_svgs(tmp_path, monkeypatch):
+    svg_files = [
+        write_svg(tmp_path, "ཀ_1_2_3.svg", "M0 0 l100 0 0 100 -100 0 z"),
+        write_svg(tmp_path, "ཁ_1_2_3.svg", "M0 0 c30 0 60 40 60 80 l-60 0 z"),
+    ]
+    cache_path = str(tmp_path / "build_cache.json")
+    expected = [(glyph.compile(None), codepoints, glyph_name)
+                for glyph, codepoints, glyph_name in compile_glyphs(svg_files)]
+
+    def built(glyphs_data):
+        return [(glyph.compile(None), codepoints, glyph_name) for glyph, codepoints, glyph_name in glyphs_data]
+
+    assert built(compile_glyphs_incremental(svg_files, GlyphBuildCache(cache_path, {"version": 1}))) == expected
+
+    compiled_files = []
+    iter_compiled_glyphs = pipeline_for_font_creation.iter_compiled_glyphs
+
+    def recording(svg_files, *args):
+        compiled_files.extend(svg_files)
+        return iter_compiled_glyphs(svg_files, *args)
+
+    monkeypatch.setattr(pipeline_for_font_creation, "iter_compiled_glyphs", recording)
+    assert built(compile_glyphs_incremental(svg_files, GlyphBuildCache(cache_path, {"version": 1}))) == expected
+    assert compiled_files == []
+
+    write_svg(tmp_path, "ཁ_1_2_3.svg", "M0 0 l50 0 0 50 -50 0 z")
+    compile_glyphs_incremental(svg_files, GlyphBuildCache(cache_path, {"version": 1}))
+    assert compiled_files == [svg_files[1]]
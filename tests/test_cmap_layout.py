@@ -0,0 +1,71 @@
+from fontTools.ttLib import TTFont
+
+from cmap_layout import build_character_map, build_cmap_table, cmap_layout_stats, order_glyphs, unique_glyph_order
+
+GLYPHS = [
+    (None, [0x0F42, 0x0FB2], "uni0F420FB2"),
+    (None, [0x0F41], "uni0F41"),
+    (None, [], ".notdef"),
+    (None, [0x0F40, 0x0FB1], "uni0F400FB1"),
+    (None, [0x0F40], "uni0F40"),
+    (None, [0x0F42], "uni0F42"),
+    (None, [0x0F40, 0x0F7A], "uni0F400F7A"),
+]
+
+
+def names(glyphs):
+    return [glyph[2] for glyph in glyphs]
+
+
+def test_order_glyphs_puts_single_codepoints_first_then_stacks():
+    assert names(order_glyphs(GLYPHS)) == [
+        "uni0F40", "uni0F41", "uni0F42", "uni0F400F7A", "uni0F400FB1", "uni0F420FB2", ".notdef"]
+
+
+def test_order_glyphs_is_stable():
+    first = (1, [0x0F40], "uni0F40")
+    second = (2, [0x0F40], "uni0F40")
+    assert order_glyphs([first, second]) == [first, second]
+
+
+def test_character_map_leaves_stacks_to_gsub():
+    assert build_character_map(GLYPHS) == {0x0F40: "uni0F40", 0x0F41: "uni0F41", 0x0F42: "uni0F42"}
+
+
+def test_cmap_table_round_trip():
+    character_map = {0x0F40: "uni0F40", 0x0F41: "uni0F41", 0x1F600: "u1F600"}
+    font = TTFont()
+    font.setGlyphOrder([".notdef", "uni0F40", "uni0F41", "u1F600"])
+    font["cmap"] = build_cmap_table(character_map)
+    subtables = {(table.platformID, table.platEncID, table.format): table for table in font["cmap"].tables}
+    assert sorted(subtables) == [(3, 1, 4), (3, 10, 12)]
+    assert subtables[3, 1, 4].cmap == {0x0F40: "uni0F40", 0x0F41: "uni0F41"}
+    assert subtables[3, 10, 12].cmap == character_map
+
+    data = font["cmap"].compile(font)
+    reloaded = font["cmap"].__class__()
+    reloaded.decompile(data, font)
+    assert reloaded.getcmap(3, 10).cmap == character_map
+
+
+def test_cmap_has_no_format_12_within_the_bmp():
+    assert [table.format for table in build_cmap_table({0x0F40: "uni0F40"}).tables] == [4]
+
+
+def test_ordered_glyphs_make_a_smaller_cmap():
+    glyphs = [(None, [codepoint], f"uni{codepoint:04X}") for codepoint in range(0x0F40, 0x0F6D)]
+    character_map = build_character_map(glyphs)
+    shuffled = [".notdef"] + names(glyphs[::2] + glyphs[1::2])
+    ordered = [".notdef"] + names(order_glyphs(glyphs))
+    shuffled_size, _, _ = cmap_layout_stats(shuffled, character_map)
+    ordered_size, ordered_segments, groups = cmap_layout_stats(ordered, character_map)
+    # one segment for the run and the closing 0xFFFF one
+    assert ordered_segments == 2
+    # out of order, the run needs a glyph ID array
+    assert ordered_size < shuffled_size
+    assert groups == 0
+
+
+def test_unique_glyph_order_keeps_base_glyphs_first():
+    glyphs = [(None, [0x0F40], "uni0F40"), (None, [0x0F41], "uni0F41"), (None, [0x0F40], "uni0F40")]
+    assert unique_glyph_order([".notdef", "space", "uni0F40"], glyphs) == [".notdef", "space", "uni0F40", "uni0F41"]
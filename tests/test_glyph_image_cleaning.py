@@ -0,0 +1,31 @@
+import numpy as np
+from PIL import Image
+
+from glyph_image_cleaning import clean_glyph_pixels
+
+
+def test_luma_matches_pil():
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(12, 16, 3), dtype=np.uint8)
+    masks = np.ones((12, 16), dtype=bool)
+    luma = np.asarray(Image.fromarray(np.dstack([pixels, np.full((12, 16), 255, np.uint8)]), "RGBA").convert("L"))
+
+    rgba, bitmap, _, _ = clean_glyph_pixels(pixels, masks, threshold=128)
+
+    assert np.array_equal(bitmap, luma < 128)
+    assert np.array_equal(rgba[..., :3], pixels)
+
+
+def test_masked_glyph_ink_and_edges():
+    pixels = np.full((10, 20, 3), 255, np.uint8)
+    pixels[2:8, 5:9] = 30
+    # dark, but outside the polygon
+    pixels[:, 15] = 0
+    masks = np.zeros((10, 20), dtype=bool)
+    masks[:, :12] = True
+
+    rgba, bitmap, left_edge, right_edge = clean_glyph_pixels(pixels, masks)
+
+    assert bitmap.sum() == 24
+    assert (int(left_edge), int(right_edge)) == (5, 8)
+    assert rgba[0, 0, 3] == 0 and rgba[3, 6, 3] == 255
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+from glyph_outline import GlyphOutline
+from potrace_path import CURVE, LINE
+
+PATHS = [
+    "M1230 3420 c-45 -12 -80 -37 -92 -70 -8 -20 -8 -48 0 -68 l8 -20 -40 0 -40 0\n"
+    "0 60 0 60 55 0 c30 0 62 4 72 8 z m-300 -200 l0 -100 100 0 0 100 -100 0 z",
+    "M0 0 C1 1 2 2 3 3 L4 4 Z M10 10 L20 10 L20 20 L10 10 Z",
+    "M5 5 L5 5 Z M0 0 L10 0 L10 10 Z",
+]
+
+
+def compiled(glyph):
+    return glyph.compile(None)
+
+
+@pytest.mark.parametrize("path_data", PATHS)
+def test_to_glyph_matches_ttglyphpen(path_data):
+    outline = GlyphOutline.from_svg_path_data(path_data).transform(np.array([[0.25, 0, 3], [0, -0.25, 800]]))
+    pen = TTGlyphPen(None)
+    outline.draw(pen)
+    assert compiled(outline.to_glyph()) == compiled(pen.glyph())
+
+
+def test_concatenate_keeps_contours():
+    first = GlyphOutline.from_path_data("M0 0 l10 0 0 10 z")
+    second = GlyphOutline.from_path_data("M20 20 l5 0 0 5 z")
+    joined = GlyphOutline.concatenate([first, GlyphOutline(), second])
+    assert joined.contour_ends.tolist() == [2, 5]
+    assert joined.bounds() == (0.0, 0.0, 25.0, 25.0)
+
+
+def test_simplify_drops_collinear_points_and_flat_curves():
+    outline = GlyphOutline.from_path_data("M0 0 l50 0.1 50 -0.1 c0 30 0 70 0 100 l-100 0 z")
+    simplified = outline.simplify(0.5)
+    assert simplified.contour_ends.tolist() == [len(simplified) - 1]
+    assert simplified.types.tolist().count(CURVE) == 0
+    assert simplified.points.tolist() == [[0, 0], [100, 0], [100, 100], [0, 100]]
+    assert set(simplified.types[1:].tolist()) == {LINE}
+
+
+def test_simplify_keeps_points_beyond_tolerance():
+    outline = GlyphOutline.from_path_data("M0 0 l50 5 50 -5 0 100 -100 0 z")
+    assert len(outline.simplify(1.0)) == len(outline)
+
+
+def arc_path_data(pieces, radius=500, sweep=360):
+    """Returns an arc about the origin drawn from the positive x axis with one cubic per piece, then closed."""
+    angles = np.radians(np.linspace(0, sweep, pieces + 1))
+    handle = radius * 4 / 3 * np.tan((angles[1] - angles[0]) / 4)
+    commands = [f"M{radius} 0"]
+    for start, end in zip(angles[:-1], angles[1:]):
+        points = [radius * np.cos(start) - handle * np.sin(start), radius * np.sin(start) + handle * np.cos(start),
+                  radius * np.cos(end) + handle * np.sin(end), radius * np.sin(end) - handle * np.cos(end),
+                  radius * np.cos(end), radius * np.sin(end)]
+        commands.append("C" + " ".join(f"{value:.3f}" for value in points))
+    return " ".join(commands) + " Z"
+
+
+def dense_points(outline, steps=200):
+    """Returns points along the outline's contours, closing lines included, close enough to stand for them."""
+    samples = []
+    t = np.linspace(0, 1, steps + 1)[:, None]
+    start = 0
+    for end in outline.contour_ends.tolist():
+        points, types = outline.points[start:end + 1], outline.types[start:end + 1]
+        index = 1
+        while index <= len(points):
+            previous = points[index - 1]
+            if index < len(points) and types[index] != LINE:
+                p1, p2, p3 = points[index:index + 3]
+                samples.append((1 - t) ** 3 * previous + 3 * t * (1 - t) ** 2 * p1 + 3 * t ** 2 * (1 - t) * p2
+                               + t ** 3 * p3)
+                index += 3
+            else:
+                samples.append(previous + t * (points[index % len(points)] - previous))
+                index += 1
+        start = end + 1
+    return np.concatenate(samples)
+
+
+def distance_to_polyline(points, polyline):
+    starts, directions = polyline[:-1], np.diff(polyline, axis=0)
+    relative = points[:, None] - starts
+    length_squared = np.maximum((directions * directions).sum(axis=1), 1e-12)
+    t = np.clip((relative * directions).sum(axis=2) / length_squared, 0, 1)
+    offsets = relative - t[..., None] * directions
+    return np.hypot(offsets[..., 0], offsets[..., 1]).min(axis=1)
+
+
+def hausdorff_distance(first, second):
+    return max(distance_to_polyline(first, second).max(), distance_to_polyline(second, first).max())
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 10.0])
+def test_simplify_refits_smooth_curves_within_tolerance(tolerance):
+    outline = GlyphOutline.from_path_data(arc_path_data(24))
+    simplified = outline.simplify(tolerance)
+    assert 0 < simplified.types.tolist().count(CURVE) < 24
+    assert hausdorff_distance(dense_points(outline), dense_points(simplified)) <= tolerance
+
+
+def test_simplify_keeps_corners():
+    # a half disc: the arc meets the diameter at right angles at (500, 0) and (-500, 0)
+    outline = GlyphOutline.from_path_data(arc_path_data(12, sweep=180))
+    simplified = outline.simplify(2.0)
+    assert simplified.types.tolist().count(CURVE) < 12
+    assert np.allclose(simplified.points[0], [500, 0])
+    assert np.allclose(simplified.points[-1], [-500, 0], atol=1e-3)
+    assert hausdorff_distance(dense_points(outline), dense_points(simplified)) <= 2.0
@@ -0,0 +1,79 @@
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph
+
+from glyph_store import GlyphStore, build_font_from_store
+from pipeline_for_font_creation import assemble_font
+
+
+def triangle(size):
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0))
+    pen.lineTo((size, 0))
+    pen.lineTo((0, size))
+    pen.closePath()
+    glyph = pen.glyph()
+    glyph.recalcBounds(None)
+    return glyph
+
+
+def make_glyphs():
+    return [
+        (triangle(100), [0x0F40], "uni0F40", 600, 0),
+        (TTGlyph(triangle(200).compile(None)), [0x0F41], "uni0F41", 700, 10),
+        (TTGlyph(), [0x0F0B], "uni0F0B", 300, 0),
+        (triangle(50), [0x0FB1], "uni0FB1", 200, 0),
+        (triangle(300), [0x0F40, 0x0FB1], "uni0F400FB1", 800, 20),
+        (triangle(150), [0x0F40], "uni0F40", 650, 5),
+    ]
+
+
+def test_round_trip_keeps_positions_and_the_last_duplicate(tmp_path):
+    store = GlyphStore(str(tmp_path / "glyphs.sqlite"))
+    assert store.replace_script("tibetan", make_glyphs()) == 5
+    stored = store.get_glyphs("tibetan")
+    store.close()
+    assert [glyph.glyph_name for glyph in stored] == ["uni0F40", "uni0F41", "uni0F0B", "uni0FB1", "uni0F400FB1"]
+    first = stored[0]
+    assert first.glyf == triangle(150).compile(None)
+    assert (first.advance_width, first.lsb, first.codepoints) == (650, 5, [0x0F40])
+    assert (first.bounds, first.contours, first.points) == ((0, 0, 150, 150), 1, 3)
+    assert (stored[2].glyf, stored[2].bounds, stored[2].points) == (b"", None, 0)
+
+
+def test_replace_script_leaves_other_scripts(tmp_path):
+    store = GlyphStore(str(tmp_path / "glyphs.sqlite"))
+    store.replace_script("tibetan", make_glyphs())
+    store.replace_script("latin", [(triangle(10), [0x41], "A", 500, 0)])
+    store.replace_script("tibetan", make_glyphs()[:1])
+    assert [glyph.glyph_name for glyph in store.get_glyphs("tibetan")] == ["uni0F40"]
+    assert [glyph.glyph_name for glyph in store.get_glyphs("latin")] == ["A"]
+    store.close()
+
+
+def test_subset_by_name_in_stored_order(tmp_path):
+    store = GlyphStore(str(tmp_path / "glyphs.sqlite"))
+    glyphs = [(TTGlyph(), [0x10000 + index], f"u{0x10000 + index:X}", 500, 0) for index in range(1200)]
+    store.replace_script("tibetan", glyphs)
+    wanted = [f"u{0x10000 + index:X}" for index in range(1199, -1, -3)] + ["missing"]
+    subset = store.get_glyphs("tibetan", wanted)
+    store.close()
+    assert [glyph.glyph_name for glyph in subset] == sorted(wanted[:-1], key=lambda name: int(name[1:], 16))
+
+
+def test_font_from_store_matches_the_assembled_font(tmp_path):
+    glyphs = make_glyphs()
+    store = GlyphStore(str(tmp_path / "glyphs.sqlite"))
+    store.replace_script("tibetan", glyphs)
+    assert build_font_from_store(store, "tibetan", None, str(tmp_path / "stored.ttf")) == 5
+    assert build_font_from_store(store, "tibetan", None, str(tmp_path / "subset.ttf"), ["uni0F41"]) == 1
+    store.close()
+    assemble_font(None, glyphs, str(tmp_path / "assembled.ttf"))
+
+    stored = TTFont(str(tmp_path / "stored.ttf"))
+    assembled = TTFont(str(tmp_path / "assembled.ttf"))
+    assert stored.getGlyphOrder() == assembled.getGlyphOrder()
+    for table_tag in ['glyf', 'loca', 'hmtx', 'cmap', 'GSUB']:
+        assert stored[table_tag].compile(stored) == assembled[table_tag].compile(assembled)
+    assert stored['head'].xMax == assembled['head'].xMax == 300
+    assert TTFont(str(tmp_path / "subset.ttf")).getGlyphOrder() == [".notdef", "uni0F41"]
@@ -0,0 +1,36 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from glyph_tracing import SVG_UNIT, bitmap_to_pbm, get_tracer, trace_outline
+
+
+def rectangle_bitmap():
+    bitmap = np.zeros((30, 40), dtype=bool)
+    bitmap[5:15, 8:20] = True
+    return bitmap
+
+
+def test_bitmap_to_pbm():
+    bitmap = np.zeros((2, 10), dtype=bool)
+    bitmap[0, 0] = bitmap[1, 9] = True
+    assert bitmap_to_pbm(bitmap) == b"P4\n10 2\n" + bytes([0x80, 0x00, 0x00, 0x40])
+
+
+@pytest.mark.parametrize("backend", ["potracer", "potrace"])
+def test_tracer_outlines_the_ink(backend):
+    if backend == "potracer":
+        pytest.importorskip("potrace")
+    elif shutil.which("potrace") is None:
+        pytest.skip("the potrace command line is not installed")
+
+    outline = trace_outline(get_tracer(backend), rectangle_bitmap())
+
+    # SVG units are tenths of a pixel, with y going up from the bottom row
+    assert outline.bounds() == pytest.approx((8 * SVG_UNIT, 15 * SVG_UNIT, 20 * SVG_UNIT, 25 * SVG_UNIT), abs=SVG_UNIT)
+
+
+def test_unknown_tracer():
+    with pytest.raises(ValueError):
+        get_tracer("autotrace")
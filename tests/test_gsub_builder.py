@@ -0,0 +1,86 @@
+from fontTools.ttLib import TTFont, newTable
+
+import gsub_builder
+from gsub_builder import GsubCache, add_gsub, compiled_gsub_table, gsub_key, ligature_rules
+
+GLYPHS = [
+    (None, [0x0F40], "uni0F40"),
+    (None, [0x0F72], "uni0F72"),
+    (None, [0x0FB1], "uni0FB1"),
+    (None, [0x0F40, 0x0FB1], "uni0F400FB1"),
+    (None, [0x0F40, 0x0FB1, 0x0F72], "uni0F400FB10F72"),
+    (None, [0x0F42, 0x0FB2], "uni0F420FB2"),
+]
+
+
+def make_font(glyph_order):
+    font = TTFont()
+    font.setGlyphOrder(glyph_order)
+    return font
+
+
+def test_ligature_rules():
+    ligatures, unreachable = ligature_rules(GLYPHS)
+    assert ligatures == {
+        ("uni0F40", "uni0FB1"): "uni0F400FB1",
+        ("uni0F40", "uni0FB1", "uni0F72"): "uni0F400FB10F72",
+    }
+    assert unreachable == ["uni0F420FB2"]
+
+
+def test_compiled_gsub_decompiles_to_the_rules():
+    ligatures, _ = ligature_rules(GLYPHS)
+    font = make_font([".notdef"] + [glyph[2] for glyph in GLYPHS])
+    gsub_table = newTable('GSUB')
+    gsub_table.decompile(compiled_gsub_table(font, ligatures).data, font)
+    gsub = gsub_table.table
+    assert [record.ScriptTag for record in gsub.ScriptList.ScriptRecord] == ["DFLT", "tibt"]
+    assert [record.FeatureTag for record in gsub.FeatureList.FeatureRecord] == ["ccmp"]
+    decompiled = {}
+    for subtable in gsub.LookupList.Lookup[0].SubTable:
+        for first, ligature_list in subtable.ligatures.items():
+            for ligature in ligature_list:
+                decompiled[(first, *ligature.Component)] = ligature.LigGlyph
+    assert decompiled == ligatures
+    # the longer stack comes first, so it is not cut short by the stack it starts with
+    assert [ligature.LigGlyph for ligature in subtable.ligatures["uni0F40"]] == ["uni0F400FB10F72", "uni0F400FB1"]
+
+
+def test_gsub_key_follows_the_glyph_ids():
+    ligatures, _ = ligature_rules(GLYPHS)
+    glyph_order = [".notdef"] + [glyph[2] for glyph in GLYPHS]
+    key = gsub_key(make_font(glyph_order), ligatures)
+    assert gsub_key(make_font(list(glyph_order)), dict(reversed(list(ligatures.items())))) == key
+    assert gsub_key(make_font(glyph_order[:1] + glyph_order[:0:-1]), ligatures) != key
+
+
+def test_cache_reuses_the_compiled_bytes(tmp_path, monkeypatch):
+    ligatures, _ = ligature_rules(GLYPHS)
+    font = make_font([".notdef"] + [glyph[2] for glyph in GLYPHS])
+    path = str(tmp_path / "gsub_cache.json")
+    data = compiled_gsub_table(font, ligatures, GsubCache(path)).data
+
+    def fail(*args):
+        raise AssertionError("compiled again")
+
+    monkeypatch.setattr(gsub_builder, "compile_gsub", fail)
+    assert compiled_gsub_table(font, ligatures, GsubCache(path)).data == data
+
+
+def test_cache_ignores_a_broken_file(tmp_path):
+    path = tmp_path / "gsub_cache.json"
+    path.write_text("{")
+    assert GsubCache(str(path)).get("key") is None
+
+
+def test_add_gsub_adds_the_compiled_table():
+    ligatures, _ = ligature_rules(GLYPHS)
+    font = make_font([".notdef"] + [glyph[2] for glyph in GLYPHS])
+    add_gsub(font, GLYPHS)
+    assert font['GSUB'].data == compiled_gsub_table(font, ligatures).data
+
+
+def test_fonts_without_stacks_get_no_gsub():
+    font = make_font([".notdef", "uni0F40"])
+    add_gsub(font, GLYPHS[:1])
+    assert 'GSUB' not in font
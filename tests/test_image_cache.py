@@ -0,0 +1,52 @@
+from image_cache import CachedImageStore, ImageCache
+from image_storage import ImageObject
+
+
+class CountingStore:
+    def __init__(self):
+        self.keys = []
+
+    def get(self, key):
+        self.keys.append(key)
+        return ImageObject(key, key.encode('utf-8') * 10, f"etag-{key}")
+
+
+def test_cached_store_asks_the_store_once(tmp_path):
+    store = CountingStore()
+    cached = CachedImageStore(store, ImageCache(str(tmp_path)))
+    assert cached.get("pages/ཀ_1.png") == cached.get("pages/ཀ_1.png")
+    cached.close()
+    reopened = CachedImageStore(store, ImageCache(str(tmp_path)))
+    assert reopened.get("pages/ཀ_1.png").etag == "etag-pages/ཀ_1.png"
+    reopened.close()
+    assert store.keys == ["pages/ཀ_1.png"]
+
+
+def test_least_recently_used_images_are_evicted(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=25)
+    for key in "abc":
+        cache.put(ImageObject(key, b"x" * 10, "1"))
+        if key == "b":
+            cache.get("a")
+    cache.close()
+    reopened = ImageCache(str(tmp_path), max_bytes=25)
+    assert list(reopened.entries) == ["a", "c"]
+    assert reopened.get("b") is None
+    reopened.close()
+
+
+def test_half_written_index_line_is_skipped_and_ended(tmp_path):
+    cache = ImageCache(str(tmp_path))
+    cache.put(ImageObject("a", b"a", "1"))
+    cache.close()
+    with open(tmp_path / "index.jsonl", 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "key": "b", "et')
+
+    cache = ImageCache(str(tmp_path))
+    assert cache.get("b") is None
+    cache.put(ImageObject("c", b"c", "1"))
+    cache.close()
+    reopened = ImageCache(str(tmp_path))
+    assert reopened.get("a").data == b"a"
+    assert reopened.get("c").data == b"c"
+    reopened.close()
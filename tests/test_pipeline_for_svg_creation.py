@@ -0,0 +1,164 @@
+import json
+import os
+import urllib.parse
+
+import pytest
+from PIL import Image, ImageDraw
+
+import coverage_planner
+import pipeline_for_svg_creation
+import sample_selection
+from glyph_manifest import read_manifest
+from progress_journal import ProgressJournal
+from shards import Shard, merge_shards
+
+pytest.importorskip("potrace")
+
+
+def annotation_line(line_id, stack, image_number, answer="accept"):
+    image_key = f"pages/{stack}_{image_number}.png"
+    return {
+        "id": line_id,
+        "image": f"https://s3.amazonaws.com/bucket/{urllib.parse.quote(image_key)}?X-Amz=1",
+        "answer": answer,
+        "spans": [
+            {"label": "Base Line", "points": [[40, 60], [120, 60]]},
+            {"label": "Glyph", "points": [[30, 50], [130, 50], [130, 150], [30, 150]]},
+        ],
+    }
+
+
+def write_page(images_dir, line, ink=True):
+    image_key = urllib.parse.unquote(line["image"].split("?")[0].split("/", 4)[4])
+    path = os.path.join(images_dir, image_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    page = Image.new("RGB", (200, 200), "white")
+    if ink:
+        ImageDraw.Draw(page).rectangle([50, 60, 110, 140], fill="black")
+    page.save(path)
+
+
+def write_jsonl(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Points the SVG pipeline at a temporary folder with local images and the potracer backend."""
+    settings = {
+        "image_cache_dir": tmp_path / "image_cache",
+        "cleaned_images_dir": tmp_path / "cleaned_images",
+        "bitmap_store_dir": tmp_path / "cleaned_bitmaps",
+        "svg_dir": tmp_path / "svg",
+        "jsonl_dir": tmp_path / "batches",
+        "annotation_index_dir": tmp_path / "index",
+        "progress_journal_path": tmp_path / "progress.jsonl",
+        "local_images_dir": tmp_path / "bucket",
+    }
+    for name, path in settings.items():
+        monkeypatch.setattr(pipeline_for_svg_creation, name, str(path))
+    monkeypatch.setattr(pipeline_for_svg_creation, "tracer_backend", "potracer")
+    os.makedirs(settings["svg_dir"])
+    return settings
+
+
+def journal_stages(path):
+    journal = ProgressJournal(str(path), resume=True)
+    journal.close()
+    return {line_id: stages for line_id, stages in journal.stages.items()}
+
+
+def test_work_queue_keeps_the_journal(pipeline, tmp_path):
+    first = annotation_line("ཀ_0", "ཀ", 0)
+    second = annotation_line("ཁ_1", "ཁ", 1)
+    for line in (first, second):
+        write_page(pipeline["local_images_dir"], line)
+    write_jsonl(os.path.join(pipeline["jsonl_dir"], "batch0.jsonl"), [first])
+    pipeline_for_svg_creation.main()
+    assert "written" in journal_stages(pipeline["progress_journal_path"])["ཀ_0"]
+
+    work_queue = tmp_path / "work_queue.jsonl"
+    write_jsonl(str(work_queue), [second])
+    pipeline_for_svg_creation.main(work_queue=str(work_queue))
+
+    stages = journal_stages(pipeline["progress_journal_path"])
+    assert "written" in stages["ཀ_0"]
+    assert "written" in stages["ཁ_1"]
+    svg_names = [name for name in os.listdir(pipeline["svg_dir"]) if name.endswith(".svg")]
+    assert {name.split("_")[0] for name in svg_names} == {"ཀ", "ཁ"}
+
+
+def test_work_queue_traces_the_lines_of_missing_svgs_again(pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(coverage_planner, "annotation_index_dir", str(pipeline["annotation_index_dir"]))
+    lines = [annotation_line("ཀ_0", "ཀ", 0), annotation_line("ཁ_1", "ཁ", 1), annotation_line("ཁ_2", "ཁ", 2)]
+    for line in lines:
+        write_page(pipeline["local_images_dir"], line)
+    write_jsonl(os.path.join(pipeline["jsonl_dir"], "batch0.jsonl"), lines)
+    pipeline_for_svg_creation.main()
+    svgs = {name.split("_")[0]: name for name in os.listdir(pipeline["svg_dir"]) if name.endswith(".svg")}
+    svg_bytes = (pipeline["svg_dir"] / svgs["ཁ"]).read_bytes()
+    os.remove(pipeline["svg_dir"] / svgs["ཁ"])
+
+    work_queue = tmp_path / "work_queue.jsonl"
+    coverage_planner.main(str(pipeline["svg_dir"]), str(pipeline["jsonl_dir"]), output_path=str(work_queue))
+    pipeline_for_svg_creation.main(work_queue=str(work_queue))
+
+    assert (pipeline["svg_dir"] / svgs["ཁ"]).read_bytes() == svg_bytes
+    assert len(read_manifest(str(pipeline["svg_dir"]))) == 2
+    journal = ProgressJournal(str(pipeline["progress_journal_path"]), resume=True)
+    journal.close()
+    # the lines queued again keep their one place under their image IDs' sample cap
+    assert journal.sample_counts == {"ཀ": 1, "ཁ": 2}
+
+
+def test_stacks_are_selected_before_the_end_of_the_stream(pipeline, monkeypatch):
+    lines = [annotation_line("ཀ_0", "ཀ", 0), annotation_line("ཀ_1", "ཀ", 1),
+             annotation_line("ཁ_2", "ཁ", 2), annotation_line("ཁ_3", "ཁ", 3)]
+    for line in lines:
+        # ཀ_1 has no ink, so it is skipped while cleaning
+        write_page(pipeline["local_images_dir"], line, ink=line["id"] != "ཀ_1")
+    write_jsonl(os.path.join(pipeline["jsonl_dir"], "batch0.jsonl"), lines)
+    flushed = []
+    flush = sample_selection.SampleSelector.flush
+    monkeypatch.setattr(sample_selection.SampleSelector, "flush", lambda self: flushed.extend(flush(self)) or [])
+
+    pipeline_for_svg_creation.main()
+
+    assert flushed == []
+    stages = journal_stages(pipeline["progress_journal_path"])
+    assert "skipped" in stages["ཀ_1"]
+    assert sum("written" in stages[line["id"]] for line in lines) == 2
+
+
+def svg_outputs(svg_dir):
+    """Returns the SVG files and the manifest records of svg_dir, whose lines are in the order the SVGs were written."""
+    svgs = {name: (svg_dir / name).read_bytes() for name in os.listdir(svg_dir) if name.endswith(".svg")}
+    return svgs, read_manifest(str(svg_dir))
+
+
+def test_merged_shards_match_an_unsharded_run(pipeline, tmp_path, monkeypatch):
+    # ཀ hashes to shard 0 of 2, ག to shard 1
+    lines = [annotation_line("ཀ_0", "ཀ", 0), annotation_line("ག_1", "ག", 1), annotation_line("ཀ_2", "ཀ", 2)]
+    for line in lines:
+        write_page(pipeline["local_images_dir"], line)
+    write_jsonl(os.path.join(pipeline["jsonl_dir"], "batch0.jsonl"), lines)
+    pipeline_for_svg_creation.main()
+    unsharded = svg_outputs(pipeline["svg_dir"])
+
+    sharded_dir = tmp_path / "sharded"
+    for name in ["svg_dir", "bitmap_store_dir", "cleaned_images_dir", "progress_journal_path"]:
+        pipeline[name] = sharded_dir / os.path.basename(pipeline[name])
+    for index in range(2):
+        # a shard points the module's folders at its own, as a process of its own would
+        for name in ["svg_dir", "bitmap_store_dir", "cleaned_images_dir", "progress_journal_path"]:
+            monkeypatch.setattr(pipeline_for_svg_creation, name, str(pipeline[name]))
+        pipeline_for_svg_creation.main(shard=Shard(index, 2))
+    merged = merge_shards(str(pipeline["svg_dir"]), str(pipeline["cleaned_images_dir"]), 2,
+                          str(pipeline["bitmap_store_dir"]))
+
+    assert merged == 2
+    assert svg_outputs(pipeline["svg_dir"]) == unsharded
+    assert {name.split("_")[0] for name in unsharded[0]} == {"ཀ", "ག"}
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from glyph_outline import GlyphOutline
+from glyph_tracing import get_tracer
+from potrace_path import parse_potrace_path_data, parse_svg_transform
+
+POTRACE_PATHS = [
+    # the layout potrace -s writes: an absolute move, then relative curves, lines and moves
+    "M1230 3420 c-45 -12 -80 -37 -92 -70 -8 -20 -8 -48 0 -68 l8 -20 -40 0 -40 0\n"
+    "0 60 0 60 55 0 c30 0 62 4 72 8 z m-300 -200 l0 -100 100 0 0 100 -100 0 z",
+    "M200 300 l0 -50 60 0 60 0 0 50 z m20 -10 c5 -5 10 -5 15 0 5 5 10 5 15 0 l0 -20 -30 0 z\n"
+    "m100 0 l10 0 0 10 -10 0 z",
+    "m10.5 20.25 c1.5 2 3 4 5 6 l-5.5 -6.25 z",
+    "M0 0",
+    "",
+]
+OTHER_PATHS = [
+    "M0 0 Q10 10 20 0 T40 0 Z",
+    "M0 0 H10 V10 h-10 z",
+    "M0 0 C1 1 2 2 3 3 L4 4 Z",
+]
+
+
+def svg_path_outline(path_data):
+    return GlyphOutline.from_svg_path_data(path_data)
+
+
+def assert_same_outline(outline, expected):
+    assert np.array_equal(outline.points, expected.points)
+    assert np.array_equal(outline.types, expected.types)
+    assert np.array_equal(outline.contour_ends, expected.contour_ends)
+
+
+@pytest.mark.parametrize("path_data", POTRACE_PATHS)
+def test_fast_parser_matches_svg_path(path_data):
+    parsed = parse_potrace_path_data(path_data)
+    assert parsed is not None
+    assert_same_outline(GlyphOutline(*parsed), svg_path_outline(path_data))
+
+
+@pytest.mark.parametrize("path_data", OTHER_PATHS)
+def test_other_paths_fall_back_to_svg_path(path_data):
+    assert_same_outline(GlyphOutline.from_path_data(path_data), svg_path_outline(path_data))
+
+
+def test_traced_path_matches_svg_path():
+    pytest.importorskip("potrace")
+    bitmap = np.zeros((40, 40), dtype=bool)
+    bitmap[5:35, 5:35] = True
+    bitmap[12:28, 12:28] = False
+    bitmap[30:34, 20:38] = True
+    svg = get_tracer("potracer").trace(bitmap)
+    path_data = svg.split(' d="')[1].split('"')[0]
+    assert_same_outline(GlyphOutline(*parse_potrace_path_data(path_data)), svg_path_outline(path_data))
+
+
+def test_parse_svg_transform():
+    matrix = parse_svg_transform("translate(0.000000,440.000000) scale(0.100000,-0.100000)")
+    assert np.allclose(matrix, [[0.1, 0, 0], [0, -0.1, 440]])
@@ -0,0 +1,44 @@
+from progress_journal import ProgressJournal
+
+
+def test_resume_replays_the_stages(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ProgressJournal(path)
+    journal.record("a", "accepted", image_id="ཀ")
+    journal.record("b", "accepted", image_id="ཀ")
+    journal.record("a", "written", svg="ཀ_1.svg")
+    journal.record("c", "skipped")
+    journal.close()
+
+    resumed = ProgressJournal(path, resume=True)
+    assert resumed.is_accepted("a") and resumed.is_finished("a")
+    assert resumed.is_accepted("b") and not resumed.is_finished("b")
+    assert resumed.is_finished("c") and not resumed.is_accepted("c")
+    assert not resumed.is_accepted("d")
+    assert resumed.sample_counts == {"ཀ": 2}
+    resumed.close()
+
+
+def test_without_resume_the_journal_starts_empty(tmp_path):
+    path = str(tmp_path / "progress" / "journal.jsonl")
+    journal = ProgressJournal(path)
+    journal.record("a", "accepted", image_id="ཀ")
+    journal.close()
+    journal = ProgressJournal(path)
+    assert not journal.is_accepted("a")
+    journal.close()
+    assert ProgressJournal(path, resume=True).sample_counts == {}
+
+
+def test_half_written_line_is_skipped_and_ended(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"id": "a", "stage": "accepted", "image_id": "ཀ"}\n{"id": "b", "sta', encoding='utf-8')
+    journal = ProgressJournal(str(path), resume=True)
+    assert journal.is_accepted("a") and not journal.is_accepted("b")
+    journal.record("b", "accepted", image_id="ཀ")
+    journal.close()
+
+    resumed = ProgressJournal(str(path), resume=True)
+    assert resumed.is_accepted("b")
+    assert resumed.sample_counts == {"ཀ": 2}
+    resumed.close()
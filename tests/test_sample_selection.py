@@ -0,0 +1,70 @@
+import numpy as np
+
+from glyph_image_cleaning import CleanedGlyph
+from sample_selection import SampleSelector, perceptual_hash, select_samples
+
+POLYGON = [(0, 0), (30, 0), (30, 30), (0, 30)]
+
+
+def cleaned_glyph(top=8, height=14, left=8, width=14, gray=0):
+    bitmap = np.zeros((31, 31), dtype=bool)
+    bitmap[top:top + height, left:left + width] = True
+    rgba = np.full((31, 31, 4), 255, np.uint8)
+    rgba[bitmap, :3] = gray
+    return CleanedGlyph(rgba, bitmap, left, left + width - 1, (0, 0, 31, 31))
+
+
+def test_perceptual_hash_ignores_position():
+    assert np.array_equal(perceptual_hash(cleaned_glyph(top=2, left=3).bitmap),
+                          perceptual_hash(cleaned_glyph(top=10, left=12).bitmap))
+
+
+def test_select_samples_prefers_sharp_ink_and_drops_duplicates():
+    glyphs = [cleaned_glyph(gray=200), cleaned_glyph(gray=0), cleaned_glyph(height=6, width=20)]
+    selector = SampleSelector(samples_per_stack=3)
+    for name, glyph in zip("abc", glyphs):
+        selection = selector.add("ཀ", name, glyph, POLYGON)
+    assert selection.best == "b"
+    assert selection.duplicates == ["a"]
+    assert selection.others == ["c"]
+
+
+def test_stack_closes_when_its_expected_samples_arrived():
+    selector = SampleSelector(samples_per_stack=10, expected={"ཀ": 3, "ཁ": 1})
+    assert selector.add("ཀ", "a", cleaned_glyph(), POLYGON) is None
+    assert selector.skip("ཀ") is None
+    assert selector.add("ཁ", "x", cleaned_glyph(), POLYGON).best == "x"
+    assert selector.add("ཀ", "b", cleaned_glyph(gray=100), POLYGON).stack == "ཀ"
+    assert selector.flush() == []
+
+
+def test_stack_with_every_sample_skipped_has_no_selection():
+    selector = SampleSelector(expected={"ཀ": 2})
+    assert selector.skip("ཀ") is None
+    assert selector.skip("ཀ") is None
+    assert selector.flush() == []
+
+
+def test_flush_returns_the_open_stacks():
+    selector = SampleSelector(expected={"ཀ": 2})
+    selector.add("ཀ", "a", cleaned_glyph(), POLYGON)
+    assert [selection.best for selection in selector.flush()] == ["a"]
+    assert selector.counts["stacks"] == 1
+
+
+def test_select_samples_keeps_order_of_samples():
+    qualities = [(0.5, 0.1, 1.0), (0.5, 0.9, 1.0)]
+    hashes = [perceptual_hash(cleaned_glyph().bitmap), perceptual_hash(cleaned_glyph(height=4).bitmap)]
+    selection = select_samples("ཀ", ["a", "b"], qualities, hashes)
+    assert selection.best == "b" and selection.others == ["a"]
+
+
+def test_equal_samples_go_to_the_first_by_sample_key():
+    selections = []
+    for names in ("ab", "ba"):
+        selector = SampleSelector(samples_per_stack=2, sample_key=lambda name: name)
+        for name in names:
+            selection = selector.add("ཀ", name, cleaned_glyph(), POLYGON)
+        selections.append(selection)
+    assert selections[0] == selections[1]
+    assert selections[0].best == "a"
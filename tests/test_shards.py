@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from bitmap_store import BitmapStore
+from glyph_manifest import glyph_record, manifest_path, read_manifest
+from shards import Shard, merge_bitmap_store, merge_shards, parse_shard, shard_of, shard_path
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == Shard(1, 4)
+    for text in ["4/4", "-1/4", "0/0", "1", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shard_of_is_the_same_in_every_run():
+    # fixed values: a stack must land in the same shard on every machine
+    assert [shard_of(stack, 1000) for stack in ["ཀ", "ཁ", "ག"]] == [752, 580, 189]
+    assert all(0 <= shard_of(chr(0x0F40 + offset), 3) < 3 for offset in range(40))
+
+
+def test_shard_path():
+    assert shard_path("../../data/svg", Shard(0, 4)) == "../../data/svg-shard-0-of-4"
+    assert shard_path("progress.jsonl", Shard(3, 4)) == "progress-shard-3-of-4.jsonl"
+
+
+def write_shard(svg_dir, shard, stacks, bitmap_store_dir=None):
+    shard_svg_dir = shard_path(str(svg_dir), shard)
+    os.makedirs(shard_svg_dir)
+    store = BitmapStore(shard_path(str(bitmap_store_dir), shard)) if bitmap_store_dir is not None else None
+    with open(manifest_path(shard_svg_dir), 'w', encoding='utf-8') as f:
+        for stack in stacks:
+            name = f"{stack}_20_1_2"
+            with open(os.path.join(shard_svg_dir, f"{name}.svg"), 'w', encoding='utf-8') as svg_file:
+                svg_file.write(f"<svg>{stack}</svg>")
+            f.write(json.dumps(glyph_record(f"{name}.svg", stack, 20, 1, 2), ensure_ascii=False) + "\n")
+            if store is not None:
+                bitmap = np.zeros((4, 20), dtype=bool)
+                bitmap[1:3, ord(stack) % 20] = True
+                store.add(name, stack, bitmap)
+    if store is not None:
+        store.close()
+
+
+def test_merge_shards_is_the_same_whichever_shard_finished_first(tmp_path):
+    outputs = []
+    for order in ([0, 1], [1, 0]):
+        root = tmp_path / "".join(map(str, order))
+        svg_dir, cleaned_dir, bitmap_dir = root / "svg", root / "cleaned", root / "bitmaps"
+        for index in order:
+            write_shard(svg_dir, Shard(index, 2), ["ཀ", "ཁ"] if index == 0 else ["ག"], bitmap_dir)
+        assert merge_shards(str(svg_dir), str(cleaned_dir), 2, str(bitmap_dir)) == 3
+        store = BitmapStore(str(bitmap_dir), resume=True)
+        bitmaps = {name: store.bitmap(name).tolist() for name in store.names()}
+        store.close()
+        outputs.append(((svg_dir / "manifest.jsonl").read_bytes(), sorted(os.listdir(svg_dir)), bitmaps))
+    assert outputs[0] == outputs[1]
+    assert list(read_manifest(str(tmp_path / "01" / "svg"))) == ["ཀ_20_1_2.svg", "ཁ_20_1_2.svg", "ག_20_1_2.svg"]
+    assert sorted(outputs[0][2]) == ["ཀ_20_1_2", "ཁ_20_1_2", "ག_20_1_2"]
+
+
+def test_merging_twice_adds_no_bitmaps(tmp_path):
+    svg_dir, cleaned_dir, bitmap_dir = tmp_path / "svg", tmp_path / "cleaned", tmp_path / "bitmaps"
+    write_shard(svg_dir, Shard(0, 1), ["ཀ", "ཁ"], bitmap_dir)
+    merge_shards(str(svg_dir), str(cleaned_dir), 1, str(bitmap_dir))
+    size = os.path.getsize(bitmap_dir / "index.jsonl")
+    merge_shards(str(svg_dir), str(cleaned_dir), 1, str(bitmap_dir))
+    assert os.path.getsize(bitmap_dir / "index.jsonl") == size
+
+    target = BitmapStore(str(bitmap_dir), resume=True)
+    merge_bitmap_store(target, target, ["ཀ_20_1_2", "missing"])
+    assert len(target) == 2
+    target.close()
+
+
+def test_merge_keeps_earlier_records(tmp_path):
+    svg_dir = tmp_path / "svg"
+    os.makedirs(svg_dir)
+    with open(manifest_path(str(svg_dir)), 'w', encoding='utf-8') as f:
+        f.write(json.dumps(glyph_record("ང_20_1_2.svg", "ང", 20, 1, 2), ensure_ascii=False) + "\n")
+    write_shard(svg_dir, Shard(0, 2), ["ཀ"])
+    assert merge_shards(str(svg_dir), str(tmp_path / "cleaned"), 2) == 1
+    assert list(read_manifest(str(svg_dir))) == ["ཀ_20_1_2.svg", "ང_20_1_2.svg"]
+
+
+def test_an_svg_in_two_shards_is_an_error(tmp_path):
+    svg_dir = tmp_path / "svg"
+    write_shard(svg_dir, Shard(0, 2), ["ཀ"])
+    write_shard(svg_dir, Shard(1, 2), ["ཀ"])
+    with pytest.raises(ValueError, match="more than one shard"):
+        merge_shards(str(svg_dir), str(tmp_path / "cleaned"), 2)